@@ -1,3 +1,23 @@
 from django.contrib import admin
 
-# Register your models here.
+from bmm.bookings.models import Booking, Ticket
+from bmm.bookings.pagination import EstimatedCountPaginator
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+
+    list_display = ["id", "uuid", "price", "paid", "created"]
+    list_filter = ["paid"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Ticket)
+class TicketAdmin(admin.ModelAdmin):
+
+    list_display = ["id", "uuid", "price", "show", "seat", "booking"]
+    list_select_related = ["show", "seat", "booking"]
+    raw_id_fields = ["show", "seat", "booking"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,4 +1,5 @@
 import logging
+import re
 from io import BytesIO
 from mimetypes import MimeTypes
 from datetime import datetime
@@ -8,12 +9,16 @@ from celery.utils.log import get_task_logger
 from celery import shared_task, chord, chain, group
 
 from django.conf import settings
+from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.clickjacking import xframe_options_exempt
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import APIException, NotFound, ValidationError
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
@@ -32,7 +37,9 @@ from bmm.bookings.models import (
     Seat,
     Show,
     Booking,
-    Ticket
+    Ticket,
+    ShowListing,
+    HallLayout,
 )
 
 from bmm.bookings.serializers import (
@@ -42,13 +49,39 @@ from bmm.bookings.serializers import (
     SeatTypeSerializer,
     SeatSerializer,
     ShowSerializer,
+    ShowValuesSerializer,
     BookingSerializer,
     TicketSerializer,
+    TicketValuesSerializer,
+    SeatHoldSerializer,
+    BestAvailableSerializer,
+    TicketRepriceSerializer,
+    TicketQuoteSerializer,
+    ShowScheduleSerializer,
+    HallLayoutSerializer,
+    HallLayoutApplySerializer,
+    ShowListingSerializer,
 )
 
+from bmm.utils.cache import CacheResponseMixin
+from bmm.utils.views import BatchMixin, ConditionalGetMixin, DynamicFieldsViewMixin, ValuesListMixin
+from bmm.bookings.filters import MovieFilter
+from bmm.bookings.pagination import CreatedCursorPagination, EstimatedCountCursorPagination
 from bmm.bookings.services import (
+    AutocompleteServices,
+    ShowListingServices,
+    MovieServices,
     TicketServices,
+    TicketsUnavailable,
+    HoldNotFound,
+    SeatHoldServices,
+    SeatMapServices,
+    ShowServices,
+    ShowConflict,
     BookingServices,
+    HallLayoutServices,
+    InvalidLayout,
+    PricingServices,
 )
 
 logger = logging.getLogger(__name__)
@@ -56,23 +89,104 @@ logger = logging.getLogger(__name__)
 default_filterset_fields = ['id', 'uuid', 'created', 'modified']
 default_ordering_fields = ['id', 'uuid', 'created', 'modified']
 default_search_fields = ['id', 'uuid']
+default_ordering = ['-created', '-id']
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class ShowConflictError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Show overlaps with another show in the hall."
+    default_code = 'show_conflict'
+
+
+class TicketConflictError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Show already has a ticket for this seat."
+    default_code = 'ticket_conflict'
+
+
+def tickets_unavailable_response(e):
+    return {'error': f"Cannot complete booking because Tickets with ID's:"
+                     f" {e.ticket_ids} are"
+                     f" already booked or held. Please try booking other tickets."}
+
+
+class MovieViewSet(CacheResponseMixin, ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
     """
     MovieViewSet can be used to create/list/detail/update movies
     """
     lookup_field = "id"
-    queryset = Movie.objects.all()
+    queryset = Movie.objects.defer('search_vector')
     serializer_class = MovieSerializer
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = default_filterset_fields + ['name', 'director', 'genre', 'release_date', 'certificate']
+    filterset_class = MovieFilter
     search_fields = default_search_fields + ['name', 'director', 'genre', 'certificate']
     ordering_fields = default_ordering_fields + ['name', 'length', 'director', 'genre', 'release_date', 'certificate']
-    ordering = ['-created']
-
-
-class TheatreViewSet(viewsets.ModelViewSet):
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+
+    def perform_update(self, serializer):
+        # Shows of a lengthened movie may now overlap other shows of their hall.
+        try:
+            with transaction.atomic():
+                movie = serializer.save()
+                if 'length' in serializer.validated_data:
+                    ShowServices.sync_time_ranges([movie.id])
+        except IntegrityError:
+            raise ShowConflictError()
+
+    def perform_bulk_write(self, serializer, created):
+        try:
+            super().perform_bulk_write(serializer, created)
+        except IntegrityError:
+            raise ShowConflictError()
+
+    def after_bulk_write(self, movies, created, fields):
+        super().after_bulk_write(movies, created, fields)
+        movie_ids = [movie.id for movie in movies]
+        if not created and 'length' in fields:
+            ShowServices.sync_time_ranges(movie_ids)
+        transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.MOVIE, movie_ids))
+        if not created:
+            for movie_id in movie_ids:
+                transaction.on_commit(lambda movie_id=movie_id: ShowListingServices.refresh_of.delay(movie_id=movie_id))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, *args, **kwargs):
+        """
+        Full text search over name, cast, director and description ranked by relevance.
+        Every word of `q` is matched as a prefix, so partially typed words match too.
+        """
+        words = re.findall(r'\w+', request.query_params.get('q', '').lower())
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            raise ValidationError({'limit': "Limit must be an integer."})
+        if not words:
+            return Response([])
+
+        query = SearchQuery(' & '.join(f"{word}:*" for word in words), config='simple', search_type='raw')
+        movies = (
+            self.get_queryset()
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-id')[:limit]
+        )
+        return Response(self.get_serializer(movies, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request, *args, **kwargs):
+        """
+        Counts of filtered movies per genre, certificate and top cast members.
+        """
+        try:
+            top_cast = min(int(request.query_params.get('top_cast', 10)), 100)
+        except ValueError:
+            raise ValidationError({'top_cast': "Top cast must be an integer."})
+        return Response(MovieServices.facets(self.filter_queryset(self.get_queryset()), top_cast=top_cast))
+
+
+class TheatreViewSet(CacheResponseMixin, ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin,
+                     viewsets.ModelViewSet):
     """
     TheatreViewSet can be used to create/list/detail/update theatre
     """
@@ -83,10 +197,21 @@ class TheatreViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['name', 'city']
     search_fields = default_search_fields + ['name', 'city']
     ordering_fields = default_ordering_fields + ['name', 'city']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
 
+    def after_bulk_write(self, theatres, created, fields):
+        super().after_bulk_write(theatres, created, fields)
+        theatre_ids = [theatre.id for theatre in theatres]
+        transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.THEATRE, theatre_ids))
+        if not created:
+            for theatre_id in theatre_ids:
+                transaction.on_commit(
+                    lambda theatre_id=theatre_id: ShowListingServices.refresh_of.delay(theatre_id=theatre_id)
+                )
 
-class HallViewSet(viewsets.ModelViewSet):
+
+class HallViewSet(CacheResponseMixin, ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
     """
     HallViewSet can be used to create/list/detail/update Hall
     """
@@ -97,10 +222,83 @@ class HallViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['name', 'theatre']
     search_fields = default_search_fields + ['name', 'theatre']
     ordering_fields = default_ordering_fields + ['name', 'theatre']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+
+    def after_bulk_write(self, halls, created, fields):
+        super().after_bulk_write(halls, created, fields)
+        if not created:
+            for hall in halls:
+                transaction.on_commit(lambda hall_id=hall.id: ShowListingServices.refresh_of.delay(hall_id=hall_id))
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, id=None):
+        """
+        Copies seats of this hall into every hall of `halls` (which must have no seats yet) in one bulk insert.
+        """
+        hall = self.get_object()
+        serializer = HallLayoutApplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            seats = HallLayoutServices.apply(HallLayoutServices.hall_seats(hall.id), serializer.validated_data['halls'])
+        except InvalidLayout as e:
+            raise ValidationError({'halls': str(e)})
+        return Response({'seats': seats}, status=status.HTTP_201_CREATED)
 
 
-class SeatTypeViewSet(viewsets.ModelViewSet):
+class HallLayoutViewSet(ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
+    """
+    HallLayoutViewSet can be used to create/list/detail/update HallLayout, apply a layout to halls
+    and diff it with another layout or the seats of a hall.
+    """
+    lookup_field = "id"
+    queryset = HallLayout.objects.all()
+    serializer_class = HallLayoutSerializer
+    filter_backends = [django_filters.rest_framework.DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_fields = default_filterset_fields + ['name']
+    search_fields = default_search_fields + ['name']
+    ordering_fields = default_ordering_fields + ['name']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+
+    @action(detail=True, methods=['post'])
+    def apply(self, request, id=None):
+        """
+        Creates seats of the layout in every hall of `halls` (which must have no seats yet) in one bulk insert.
+        """
+        layout = self.get_object()
+        serializer = HallLayoutApplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            seats = HallLayoutServices.apply(HallLayoutServices.expand(layout.spec), serializer.validated_data['halls'])
+        except InvalidLayout as e:
+            raise ValidationError({'halls': str(e)})
+        return Response({'seats': seats}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def diff(self, request, id=None):
+        """
+        Seats added, removed and changed going from this layout to `layout` or to current seats of `hall`.
+        """
+        layout = self.get_object()
+        other_layout = request.query_params.get('layout', None)
+        hall = request.query_params.get('hall', None)
+        if other_layout is not None and other_layout.isdigit():
+            other = HallLayout.objects.filter(id=other_layout).first()
+            if other is None:
+                raise NotFound(f"Hall layout: {other_layout} does not exist.")
+            other_seats = HallLayoutServices.expand(other.spec)
+        elif hall is not None and hall.isdigit():
+            if not Hall.objects.filter(id=hall).exists():
+                raise NotFound(f"Hall: {hall} does not exist.")
+            other_seats = HallLayoutServices.hall_seats(int(hall))
+        else:
+            raise ValidationError("Either `layout` or `hall` ID is required.")
+        return Response(HallLayoutServices.diff(HallLayoutServices.expand(layout.spec), other_seats))
+
+
+class SeatTypeViewSet(CacheResponseMixin, ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin,
+                      viewsets.ModelViewSet):
     """
     SeatTypeViewSet can be used to create/list/detail/update SeatType
     """
@@ -111,10 +309,22 @@ class SeatTypeViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['name', 'price_multiplier', 'theatre']
     search_fields = default_search_fields + ['name', 'price_multiplier', 'theatre']
     ordering_fields = default_ordering_fields + ['name', 'price_multiplier', 'theatre']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            seat_type = serializer.save()
+            if 'price_multiplier' in serializer.validated_data:
+                TicketServices.reprice_tickets(seat_type_ids=[seat_type.id])
 
+    def after_bulk_write(self, seat_types, created, fields):
+        super().after_bulk_write(seat_types, created, fields)
+        if not created and 'price_multiplier' in fields:
+            TicketServices.reprice_tickets(seat_type_ids=[seat_type.id for seat_type in seat_types])
 
-class SeatViewSet(viewsets.ModelViewSet):
+
+class SeatViewSet(ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
     """
     SeatViewSet can be used to create/list/detail/update Seat
     """
@@ -125,10 +335,23 @@ class SeatViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['row', 'column', 'seat_type', 'hall']
     search_fields = default_search_fields + ['row', 'column', 'seat_type', 'hall']
     ordering_fields = default_ordering_fields + ['row', 'column', 'seat_type', 'hall']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            seat = serializer.save()
+            if 'seat_type' in serializer.validated_data:
+                TicketServices.reprice_tickets(seat_ids=[seat.id])
+
+    def after_bulk_write(self, seats, created, fields):
+        super().after_bulk_write(seats, created, fields)
+        if not created and 'seat_type' in fields:
+            TicketServices.reprice_tickets(seat_ids=[seat.id for seat in seats])
 
 
-class ShowViewSet(viewsets.ModelViewSet):
+class ShowViewSet(CacheResponseMixin, ConditionalGetMixin, ValuesListMixin, DynamicFieldsViewMixin, BatchMixin,
+                  viewsets.ModelViewSet):
     """
     SeatViewSet can be used to create/list/detail/update Show
     """
@@ -136,23 +359,104 @@ class ShowViewSet(viewsets.ModelViewSet):
     queryset = Show.objects.all()
     serializer_class = ShowSerializer
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = default_filterset_fields + ['start_time', 'base_price', 'movie', 'hall']
+    filterset_fields = default_filterset_fields + ['start_time', 'base_price', 'movie', 'hall', 'seats_available']
     search_fields = default_search_fields + ['start_time', 'base_price', 'movie', 'hall']
-    ordering_fields = default_ordering_fields + ['start_time', 'base_price', 'movie', 'hall']
-    ordering = ['-created']
-
-    def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+    ordering_fields = default_ordering_fields + ['start_time', 'base_price', 'movie', 'hall', 'seats_available']
+    ordering = default_ordering
+    pagination_class = CreatedCursorPagination
+    values_serializer_class = ShowValuesSerializer
+
+    def get_bulk_queryset(self):
+        return super().get_bulk_queryset().select_related('movie')
+
+    def perform_create(self, serializer):
+        # Exclusion constraint still guards against overlapping shows created concurrently.
+        try:
+            with transaction.atomic():
+                show = serializer.save()
+        except IntegrityError:
+            raise ShowConflictError()
+        logger.info(f"Sending task for creating tickets for show id: {show.id}")
+        transaction.on_commit(lambda: TicketServices.create_tickets_for_show.apply_async((show.id,)))
+
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                show = serializer.save()
+                if 'base_price' in serializer.validated_data:
+                    TicketServices.reprice_tickets(show_ids=[show.id])
+        except IntegrityError:
+            raise ShowConflictError()
+
+    def perform_bulk_write(self, serializer, created):
+        try:
+            super().perform_bulk_write(serializer, created)
+        except IntegrityError:
+            raise ShowConflictError()
+
+    def after_bulk_write(self, shows, created, fields):
+        super().after_bulk_write(shows, created, fields)
+        show_ids = [show.id for show in shows]
+        movie_ids = sorted({show.movie_id for show in shows})
+        if created:
+            ShowServices.generate_tickets(show_ids)
+        else:
+            if 'base_price' in fields:
+                TicketServices.reprice_tickets(show_ids=show_ids)
+            transaction.on_commit(lambda: ShowListingServices.refresh(show_ids))
+        transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.MOVIE, movie_ids))
+
+    @action(detail=False, methods=['post'])
+    def schedule(self, request, *args, **kwargs):
+        """
+        Creates shows of a movie in a hall for every day in a date range at given start times.
+        Tickets are generated in background, progress can be checked with `schedule/{job_id}`.
+        """
+        serializer = ShowScheduleSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        show_id = serializer.data.get('id', None)
-        logger.info(f"Sending task for creating tickets for show id: {show_id}")
-        TicketServices.create_tickets_for_show.apply_async((show_id,))
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-
-
-class BookingViewSet(viewsets.ModelViewSet):
+        try:
+            shows, job_id = ShowServices.schedule_shows(**serializer.validated_data)
+        except ShowConflict as e:
+            return Response({'error': "Shows overlap with other shows in the hall.", 'conflicts': e.conflicts},
+                            status=status.HTTP_409_CONFLICT)
+        except IntegrityError:
+            raise ShowConflictError()
+        response = {
+            'job_id': job_id,
+            'shows': ShowSerializer(shows, many=True).data,
+        }
+        return Response(response, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path=r'schedule/(?P<job_id>[^/.]+)')
+    def schedule_progress(self, request, job_id=None):
+        progress = ShowServices.job_progress(job_id)
+        if progress is None:
+            raise NotFound()
+        return Response(progress)
+
+    @action(detail=False, methods=['get'])
+    def pricing(self, request, *args, **kwargs):
+        """
+        Dry run of dynamic pricing for upcoming shows of `shows` (comma separated ID's): occupancy,
+        current and quoted price factor, quoted price per seat type and how many tickets would be repriced.
+        """
+        shows = [value.strip() for value in request.query_params.get('shows', '').split(',') if value.strip()]
+        if not shows or not all(show_id.isdigit() for show_id in shows):
+            raise ValidationError({'shows': "Comma separated show ID's are required."})
+        if len(shows) > settings.BATCH_MAX_SIZE:
+            raise ValidationError({'shows': f"At most {settings.BATCH_MAX_SIZE} shows can be quoted at once."})
+        return Response(PricingServices.quote([int(show_id) for show_id in shows]))
+
+    @action(detail=True, methods=['get'])
+    def seatmap(self, request, id=None):
+        """
+        Returns hall layout of the show with packed bitsets of sold and held seats.
+        """
+        show = self.get_object()
+        return Response(SeatMapServices.seatmap(show.id))
+
+
+class BookingViewSet(ConditionalGetMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
     """
     BookingViewSet can be used to create/list/detail/update Booking
     """
@@ -163,34 +467,56 @@ class BookingViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['price', 'paid']
     search_fields = default_search_fields + ['price', 'paid']
     ordering_fields = default_ordering_fields + ['price', 'paid']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = EstimatedCountCursorPagination
+    # Exact counts of huge tables are what EstimatedCountCursorPagination avoids, so only detail views are conditional.
+    conditional_list = False
+    # Bookings claim their tickets, they can only be created one by one through BookingServices.
+    bulk_writes = False
 
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        tickets_data = TicketServices.check_availability(serializer.validated_data.get('ticket_ids', None))
-        if tickets_data['available']:
-            serializer.validated_data['price'] = tickets_data['booking_price']
-            self.perform_create(serializer)
-            TicketServices.book_tickets(
-                serializer.data.get('ticket_ids', None),
-                serializer.data.get('id', None)
-            )
-            BookingServices.delete_if_unpaid.apply_async((serializer.data.get('id', None),), countdown=100)
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        try:
+            BookingServices.create_booking(serializer, hold_token=request.data.get('hold', None))
+        except TicketsUnavailable as e:
+            return Response(tickets_unavailable_response(e), status=status.HTTP_409_CONFLICT)
 
-        else:
-            response = {'error': f"Cannot complete booking because Tickets with ID's:"
-                                 f" {tickets_data['already_booked_ticket_ids']} are"
-                                 f" already booked. Please try booking other tickets."}
-            return Response(response, status=status.HTTP_409_CONFLICT)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=False, methods=['post'], url_path='best')
+    def best_available(self, request, *args, **kwargs):
+        """
+        Books `count` best adjacent free seats in one row of `show`, optionally of one `seat_type`.
+        """
+        serializer = BestAvailableSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        seat_type = data.get('seat_type', None)
+        try:
+            booking = BookingServices.book_best_available(
+                data['show'].id, data['count'],
+                seat_type_id=seat_type.id if seat_type else None,
+                hold_token=data.get('hold', None),
+            )
+        except TicketsUnavailable:
+            return Response({'error': f"No {data['count']} adjacent seats are available in a row for this show."},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(booking).data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        try:
+            BookingServices.update_booking(serializer)
+        except Booking.DoesNotExist:
+            raise NotFound("Booking was released.")
 
+    def perform_destroy(self, instance):
+        BookingServices.release_bookings([instance.id])
 
 
-class TicketViewSet(viewsets.ModelViewSet):
+class TicketViewSet(ConditionalGetMixin, ValuesListMixin, DynamicFieldsViewMixin, BatchMixin, viewsets.ModelViewSet):
     """
     TicketViewSet can be used to create/list/detail/update Ticket
     """
@@ -201,4 +527,193 @@ class TicketViewSet(viewsets.ModelViewSet):
     filterset_fields = default_filterset_fields + ['price', 'show', 'seat', 'booking']
     search_fields = default_search_fields + ['price', 'show', 'seat', 'booking']
     ordering_fields = default_ordering_fields + ['price', 'show', 'seat', 'booking']
-    ordering = ['-created']
+    ordering = default_ordering
+    pagination_class = EstimatedCountCursorPagination
+    conditional_list = False
+    values_serializer_class = TicketValuesSerializer
+
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                ticket = serializer.save()
+                self.tickets_changed([ticket.show_id])
+        except IntegrityError:
+            raise TicketConflictError()
+
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                show_id = serializer.instance.show_id
+                ticket = serializer.save()
+                self.tickets_changed([show_id, ticket.show_id])
+        except IntegrityError:
+            raise TicketConflictError()
+
+    def perform_destroy(self, ticket):
+        with transaction.atomic():
+            ticket.delete()
+            self.tickets_changed([ticket.show_id])
+
+    def perform_bulk_write(self, serializer, created):
+        try:
+            super().perform_bulk_write(serializer, created)
+        except IntegrityError:
+            raise TicketConflictError()
+
+    def after_bulk_write(self, tickets, created, fields):
+        super().after_bulk_write(tickets, created, fields)
+        self.tickets_changed([ticket.show_id for ticket in tickets])
+
+    def tickets_changed(self, show_ids):
+        """Reconciles seat counters of shows whose tickets were written and drops their seat map layouts."""
+        show_ids = sorted(set(show_ids))
+        ShowServices.reconcile_seat_counts(show_ids)
+        for show_id in show_ids:
+            transaction.on_commit(lambda show_id=show_id: SeatMapServices.invalidate(show_id))
+
+    @action(detail=False, methods=['post'])
+    def reprice(self, request, *args, **kwargs):
+        """
+        Reprices unsold tickets of upcoming shows in `shows`, `theatres` and `seat_types` from current
+        show base prices and seat type multipliers.
+        """
+        serializer = TicketRepriceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        repriced = TicketServices.reprice_tickets(
+            show_ids=data.get('shows', None),
+            theatre_ids=data.get('theatres', None),
+            seat_type_ids=data.get('seat_types', None),
+        )
+        return Response({'repriced': repriced})
+
+    @action(detail=False, methods=['post'])
+    def quote(self, request, *args, **kwargs):
+        """
+        Availability and total price of each ticket ID list of `selections`, tickets held by `hold` count
+        as available. Answers all selections with one query, so alternatives can be compared in one call.
+        """
+        serializer = TicketQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(TicketServices.quote_selections(data['selections'], hold_token=data.get('hold', None)))
+
+
+class SeatHoldViewSet(viewsets.ViewSet):
+    """
+    SeatHoldViewSet can be used to hold/extend/release/checkout seats of a show.
+    Holds live in cache only and expire on their own after SEAT_HOLD_TTL seconds.
+    """
+    lookup_field = "token"
+
+    def create(self, request, *args, **kwargs):
+        serializer = SeatHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold = SeatHoldServices.hold(
+                serializer.validated_data['show'],
+                serializer.validated_data['ticket_ids']
+            )
+        except TicketsUnavailable as e:
+            return Response(tickets_unavailable_response(e), status=status.HTTP_409_CONFLICT)
+        return Response(SeatHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, token=None):
+        try:
+            hold = SeatHoldServices.get(token)
+        except HoldNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(SeatHoldSerializer(hold).data)
+
+    def destroy(self, request, token=None):
+        SeatHoldServices.release(token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def extend(self, request, token=None):
+        try:
+            hold = SeatHoldServices.extend(token)
+        except HoldNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(SeatHoldSerializer(hold).data)
+
+    @action(detail=True, methods=['post'])
+    def checkout(self, request, token=None):
+        try:
+            hold = SeatHoldServices.get(token)
+        except HoldNotFound as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = BookingSerializer(data={'ticket_ids': [str(ticket_id) for ticket_id in hold['ticket_ids']]})
+        serializer.is_valid(raise_exception=True)
+        try:
+            BookingServices.create_booking(serializer, hold_token=token)
+        except TicketsUnavailable as e:
+            return Response(tickets_unavailable_response(e), status=status.HTTP_409_CONFLICT)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    AutocompleteViewSet suggests movies and theatres whose name starts with `q`, most popular first.
+    `city` limits theatres to the city and movies to ones with upcoming shows in the city,
+    `kind` can be `movie` or `theatre` to get only one of them.
+    """
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '')
+        city = request.query_params.get('city', None)
+        kind = request.query_params.get('kind', None)
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            raise ValidationError({'limit': "Limit must be an integer."})
+
+        response = {}
+        if kind in (None, AutocompleteServices.MOVIE):
+            response['movies'] = AutocompleteServices.suggest(AutocompleteServices.MOVIE, query, city, limit)
+        if kind in (None, AutocompleteServices.THEATRE):
+            response['theatres'] = AutocompleteServices.suggest(AutocompleteServices.THEATRE, query, city, limit)
+        return Response(response)
+
+
+class ShowListingViewSet(viewsets.GenericViewSet):
+    """
+    ShowListingViewSet lists shows of a `city` on a `date` (default today) grouped by movie,
+    with theatre, hall, start time and remaining seats of every show. Optionally filtered by `movie`.
+    """
+    queryset = ShowListing.objects.select_related('show')
+    serializer_class = ShowListingSerializer
+
+    def list(self, request, *args, **kwargs):
+        city = request.query_params.get('city', None)
+        if not city:
+            raise ValidationError({'city': "City is required."})
+        try:
+            date = datetime.strptime(request.query_params['date'], '%Y-%m-%d').date() \
+                if 'date' in request.query_params else timezone.localdate()
+        except ValueError:
+            raise ValidationError({'date': "Date must be in YYYY-MM-DD format."})
+
+        listings = self.get_queryset().filter(city=city, date=date)
+        movie_id = request.query_params.get('movie', None)
+        if movie_id is not None:
+            if not movie_id.isdigit():
+                raise ValidationError({'movie': "Movie must be an integer."})
+            listings = listings.filter(movie_id=movie_id)
+
+        movies = []
+        for listing in listings.order_by('movie_name', 'movie_id', 'start_time'):
+            if not movies or movies[-1]['movie']['id'] != listing.movie_id:
+                movies.append({
+                    'movie': {
+                        'id': listing.movie_id,
+                        'name': listing.movie_name,
+                        'genre': listing.movie_genre,
+                        'certificate': listing.movie_certificate,
+                        'length': listing.movie_length,
+                    },
+                    'shows': [],
+                })
+            movies[-1]['shows'].append(self.get_serializer(listing).data)
+        return Response(movies)
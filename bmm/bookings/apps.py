@@ -1,6 +1,11 @@
 from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
+
 class BookingsConfig(AppConfig):
     name = 'bmm.bookings'
     verbose_name = _("Bookings")
+
+    def ready(self):
+        from bmm.bookings.signals import connect_cache_generation_receivers
+        connect_cache_generation_receivers(self)
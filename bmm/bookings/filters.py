@@ -0,0 +1,26 @@
+import django_filters
+
+from bmm.bookings.models import Movie
+
+
+class MovieFilter(django_filters.FilterSet):
+    """
+    `cast` matches movies featuring all of the comma separated cast members,
+    `cast_any` matches movies featuring at least one of them.
+    """
+    cast = django_filters.CharFilter(method='filter_cast')
+    cast_any = django_filters.CharFilter(method='filter_cast_any')
+
+    class Meta:
+        model = Movie
+        fields = ['id', 'uuid', 'created', 'modified', 'name', 'director', 'genre', 'release_date', 'certificate']
+
+    @staticmethod
+    def _members(value):
+        return [member.strip() for member in value.split(',') if member.strip()]
+
+    def filter_cast(self, queryset, name, value):
+        return queryset.filter(cast__contains=self._members(value))
+
+    def filter_cast_any(self, queryset, name, value):
+        return queryset.filter(cast__overlap=self._members(value))
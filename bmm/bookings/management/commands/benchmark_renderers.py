@@ -0,0 +1,51 @@
+import io
+import timeit
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from bmm.bookings.models import Ticket
+from bmm.bookings.serializers import TicketSerializer
+from bmm.utils.parsers import ORJSONParser
+from bmm.utils.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Compares DRF's JSONRenderer/JSONParser with the orjson based ones on TicketSerializer payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Tickets per payload")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs, best one is reported")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # Unsaved tickets, related fields are rendered from *_id attributes so no database is needed.
+        tickets = [
+            Ticket(id=i, uuid=uuid.uuid4(), created=now, modified=now, price=150.0 + i % 7,
+                   show_id=i // 200, seat_id=i % 200, booking_id=i // 3 if i % 2 else None)
+            for i in range(options["rows"])
+        ]
+        data = TicketSerializer(tickets, many=True).data
+
+        results = []
+        for name, renderer, parser in [
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ]:
+            body = renderer.render(data, "application/json")
+            render = min(timeit.repeat(lambda: renderer.render(data, "application/json"),
+                                       number=1, repeat=options["repeat"]))
+            parse = min(timeit.repeat(lambda: parser.parse(io.BytesIO(body)),
+                                      number=1, repeat=options["repeat"]))
+            results.append((name, render, parse, len(body)))
+
+        self.stdout.write(f"{'renderer':<10}{'render ms':>12}{'parse ms':>12}{'bytes':>12}")
+        for name, render, parse, size in results:
+            self.stdout.write(f"{name:<10}{render * 1000:>12.2f}{parse * 1000:>12.2f}{size:>12}")
+        (_, json_render, json_parse, _), (_, fast_render, fast_parse, _) = results
+        self.stdout.write(self.style.SUCCESS(
+            f"orjson renders {json_render / fast_render:.1f}x and parses {json_parse / fast_parse:.1f}x faster"
+        ))
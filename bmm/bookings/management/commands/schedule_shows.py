@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from bmm.bookings.serializers import ShowScheduleSerializer
+from bmm.bookings.services import ShowConflict, ShowServices
+
+
+class Command(BaseCommand):
+    help = "Schedules shows of a movie in a hall for every day in a date range at given start times."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--movie", required=True, type=int, help="ID of movie")
+        parser.add_argument("--hall", required=True, type=int, help="ID of hall")
+        parser.add_argument("--base-price", required=True, type=float)
+        parser.add_argument("--start-date", required=True, help="YYYY-MM-DD")
+        parser.add_argument("--end-date", required=True, help="YYYY-MM-DD")
+        parser.add_argument("--start-times", required=True, help="Comma separated HH:MM, e.g. 10:00,13:30")
+
+    def handle(self, *args, **options):
+        serializer = ShowScheduleSerializer(data={
+            "movie": options["movie"],
+            "hall": options["hall"],
+            "base_price": options["base_price"],
+            "start_date": options["start_date"],
+            "end_date": options["end_date"],
+            "start_times": options["start_times"].split(","),
+        })
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+
+        try:
+            shows, job_id = ShowServices.schedule_shows(**serializer.validated_data)
+        except ShowConflict as e:
+            conflicts = "\n".join(self.format_conflict(conflict) for conflict in e.conflicts)
+            raise CommandError(f"Shows overlap with other shows in the hall:\n{conflicts}")
+        except IntegrityError:
+            # Exclusion constraint caught a show created concurrently with the conflict check.
+            raise CommandError("Shows overlap with other shows in the hall.")
+        self.stdout.write(self.style.SUCCESS(f"Scheduled {len(shows)} shows, tickets job: {job_id}"))
+
+    def format_conflict(self, conflict):
+        other = f"show {conflict['conflicting_show']}" if conflict['conflicting_show'] else "another new show"
+        return (f"{conflict['start_time']} - {conflict['end_time']} overlaps {other}"
+                f" ({conflict['conflicting_start_time']} - {conflict['conflicting_end_time']})")
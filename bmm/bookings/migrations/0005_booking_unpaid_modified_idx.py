@@ -0,0 +1,17 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_auto_20200921_0913'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('paid', False)), fields=['modified'], name='booking_unpaid_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_unpaid_modified_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ticket',
+            constraint=models.UniqueConstraint(fields=('show', 'seat'), name='unique_show_seat_ticket'),
+        ),
+    ]
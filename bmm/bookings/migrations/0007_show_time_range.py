@@ -0,0 +1,59 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:17
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def check_overlapping_shows(apps, schema_editor):
+    # Exclusion constraint cannot be added over existing overlaps, report them instead of a bare constraint error.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT a.hall_id, a.id, b.id
+            FROM bookings_show a
+            JOIN bookings_show b ON b.hall_id = a.hall_id AND b.id > a.id AND b.time_range && a.time_range
+            WHERE NOT a.is_deleted AND NOT b.is_deleted
+            ORDER BY a.hall_id, a.id, b.id
+        """)
+        overlaps = cursor.fetchall()
+    if overlaps:
+        pairs = ', '.join(f"hall {hall_id}: shows {show_id} and {other_show_id}"
+                          for hall_id, show_id, other_show_id in overlaps)
+        raise RuntimeError(
+            f"Cannot prevent overlapping shows, {len(overlaps)} pairs of live shows already overlap ({pairs})."
+            f" Move or delete one show of each pair and run the migration again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_unique_show_seat_ticket'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='show',
+            name='time_range',
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(blank=True, editable=False, null=True, verbose_name='Time Range'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE bookings_show
+                SET time_range = tstzrange(
+                    bookings_show.start_time,
+                    bookings_show.start_time + bookings_movie.length * interval '1 minute'
+                )
+                FROM bookings_movie
+                WHERE bookings_movie.id = bookings_show.movie_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(check_overlapping_shows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='show',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(is_deleted=False), expressions=[('hall', '='), ('time_range', '&&')], name='exclude_overlapping_hall_shows'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_show_time_range'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_booking_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hall',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_hall_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_seat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seattype',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_seattype_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='show',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_show_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='theatre',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_theatre_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_ticket_created_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:19
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION bookings_movie_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(array_to_string(NEW."cast", ' '), '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.director, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bookings_movie_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, "cast", director, description ON bookings_movie
+    FOR EACH ROW EXECUTE PROCEDURE bookings_movie_search_vector_update();
+
+UPDATE bookings_movie SET name = name;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS bookings_movie_search_vector_trigger ON bookings_movie;
+DROP FUNCTION IF EXISTS bookings_movie_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_created_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True, verbose_name='Search Vector'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='movie_search_vector_idx'),
+        ),
+        migrations.RunSQL(sql=SEARCH_VECTOR_TRIGGER, reverse_sql=DROP_SEARCH_VECTOR_TRIGGER),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_movie_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['cast'], name='movie_cast_idx'),
+        ),
+    ]
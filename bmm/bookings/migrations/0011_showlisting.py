@@ -0,0 +1,37 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_movie_cast_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShowListing',
+            fields=[
+                ('show', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='bookings.Show', verbose_name='Show')),
+                ('city', models.CharField(max_length=100, verbose_name='Theatre City')),
+                ('date', models.DateField(verbose_name='Show Date')),
+                ('start_time', models.DateTimeField(verbose_name='Start Time')),
+                ('movie_name', models.CharField(max_length=100, verbose_name='Movie Name')),
+                ('movie_genre', models.CharField(blank=True, max_length=100, null=True, verbose_name='Genre of Movie')),
+                ('movie_certificate', models.CharField(max_length=100, verbose_name='Certificate of Movie')),
+                ('movie_length', models.FloatField(verbose_name='Movie Length')),
+                ('theatre_name', models.CharField(max_length=100, verbose_name='Theatre Name')),
+                ('hall_name', models.CharField(max_length=100, verbose_name='Hall Name')),
+                ('remaining_seats', models.IntegerField(default=0, verbose_name='Remaining Seats')),
+                ('hall', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listings', to='bookings.Hall', verbose_name='Hall')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listings', to='bookings.Movie', verbose_name='Movie')),
+                ('theatre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listings', to='bookings.Theatre', verbose_name='Theatre')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='showlisting',
+            index=models.Index(fields=['city', 'date', 'movie'], name='show_listing_city_date_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_showlisting'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='showlisting',
+            name='remaining_seats',
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='seats_available',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Available Seats'),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='seats_held',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Held Seats'),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='seats_sold',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Sold Seats'),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE bookings_show
+                SET seats_available = counts.available, seats_held = counts.held, seats_sold = counts.sold
+                FROM (
+                    SELECT
+                        t.show_id,
+                        count(*) FILTER (WHERE t.booking_id IS NULL) AS available,
+                        count(*) FILTER (WHERE t.booking_id IS NOT NULL AND NOT b.paid) AS held,
+                        count(*) FILTER (WHERE b.paid) AS sold
+                    FROM bookings_ticket t
+                    LEFT JOIN bookings_booking b ON b.id = t.booking_id
+                    WHERE NOT t.is_deleted
+                    GROUP BY t.show_id
+                ) counts
+                WHERE bookings_show.id = counts.show_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_show_seat_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='score',
+            field=models.FloatField(default=0, verbose_name='Seat Score'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:44
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django_extensions.db.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_seat_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallLayout',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Layout Name')),
+                ('spec', django.contrib.postgres.fields.jsonb.JSONField(verbose_name='Layout Spec')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='halllayout',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['created', 'id'], name='bookings_layout_created_idx'),
+        ),
+    ]
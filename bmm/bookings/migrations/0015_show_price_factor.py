@@ -0,0 +1,18 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_hall_layout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='price_factor',
+            field=models.FloatField(default=1.0, editable=False, verbose_name='Price Factor'),
+        ),
+    ]
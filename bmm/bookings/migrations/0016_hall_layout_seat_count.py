@@ -0,0 +1,73 @@
+# Generated by Django 3.0.10 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+# Frozen copy of the layout rules when this migration was written, later changes of HallLayoutServices
+# must not change what it computes. Invalid layouts keep seat count 0.
+MAX_SEATS = 5000
+
+
+def layout_values(text):
+    values = []
+    for part in str(text).split(','):
+        start, _, end = part.strip().partition('-')
+        end = end or start
+        if start.isdigit() and end.isdigit():
+            start, end, to_value = int(start), int(end), str
+        elif len(start) == 1 and len(end) == 1 and start.isalpha() and end.isalpha():
+            start, end, to_value = ord(start), ord(end), chr
+        else:
+            return None
+        if len(values) + end - start + 1 > MAX_SEATS:
+            return None
+        values += [to_value(value) for value in range(start, end + 1)]
+    return values or None
+
+
+def layout_seat_count(spec):
+    bands = spec.get('bands', None) if isinstance(spec, dict) else None
+    if not bands or not isinstance(bands, list):
+        return 0
+    seats = set()
+    for band in bands:
+        if not isinstance(band, dict) or not all(band.get(key) for key in ['rows', 'columns', 'seat_type']):
+            return 0
+        try:
+            float(band.get('score', 0))
+            gaps = {str(int(gap)) for gap in band.get('gaps', [])}
+        except (TypeError, ValueError):
+            return 0
+        rows, columns = layout_values(band['rows']), layout_values(band['columns'])
+        if rows is None or columns is None:
+            return 0
+        band_seats = [(row, column) for row in rows for column in columns if column not in gaps]
+        if len(set(band_seats)) < len(band_seats) or seats.intersection(band_seats):
+            return 0
+        seats.update(band_seats)
+        if len(seats) > MAX_SEATS:
+            return 0
+    return len(seats)
+
+
+def count_seats(apps, schema_editor):
+    HallLayout = apps.get_model('bookings', 'HallLayout')
+    for layout in HallLayout.objects.all():
+        layout.seat_count = layout_seat_count(layout.spec)
+        layout.save(update_fields=['seat_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_show_price_factor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='halllayout',
+            name='seat_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Seat Count'),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,14 @@
+from django.contrib.postgres.operations import CryptoExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """gen_random_uuid() used for uuids of tickets created in SQL needs pgcrypto before PostgreSQL 13."""
+
+    dependencies = [
+        ('bookings', '0016_hall_layout_seat_count'),
+    ]
+
+    operations = [
+        CryptoExtension(),
+    ]
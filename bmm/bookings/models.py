@@ -1,9 +1,13 @@
-from datetime import date
+from datetime import date, timedelta
 
 from django.db import models
 from django.db.models import IntegerField
 from django.utils.translation import gettext_lazy as _
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField, JSONField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from psycopg2.extras import DateTimeTZRange
 
 from bmm.utils.models import BaseModel
 
@@ -95,9 +99,17 @@ class Movie(BaseModel):
         max_length=100,
     )
 
-    # class Meta:
-    #     db_table = 'movie'
-    #     app_label = 'bookings.movie'
+    # Weighted tsvector of name, cast, director and description, maintained by a database trigger.
+    search_vector = SearchVectorField(
+        verbose_name='Search Vector',
+        null=True, blank=True, editable=False,
+    )
+
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [
+            GinIndex(fields=['search_vector'], name='movie_search_vector_idx'),
+            GinIndex(fields=['cast'], name='movie_cast_idx'),
+        ]
 
     def __str__(self):
         return f"Movie[id={self.id} uuid={self.uuid} name={self.name}]"
@@ -224,6 +236,12 @@ class Seat(BaseModel):
         null=False, blank=False, on_delete=models.CASCADE,
     )
 
+    # Desirability of the seat for best available allocation, higher is better (e.g. centre of the hall).
+    score = models.FloatField(
+        verbose_name='Seat Score',
+        null=False, blank=False, default=0,
+    )
+
     # class Meta:
     #     db_table = 'smart_parser_parser'
 
@@ -231,6 +249,42 @@ class Seat(BaseModel):
         return f"Seat [id={self.id} uuid={self.uuid} row={self.row} column={self.column}]"
 
 
+class HallLayout(BaseModel):
+    """
+       HallLayout Model represents a reusable seating plan which can be applied to halls.
+    """
+
+    name = models.CharField(
+        verbose_name='Layout Name',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    # Bands of rows sharing columns, gaps and seat type, see HallLayoutServices.expand for the format.
+    spec = JSONField(
+        verbose_name='Layout Spec',
+        null=False, blank=False,
+    )
+
+    # Number of seats `spec` expands to, set when the layout is written.
+    seat_count = models.IntegerField(
+        verbose_name='Seat Count',
+        null=False, blank=False, default=0, editable=False,
+    )
+
+    class Meta(BaseModel.Meta):
+        # The inherited index name would exceed Django's 30 character limit for this model.
+        indexes = [
+            models.Index(
+                fields=['created', 'id'], name='bookings_layout_created_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Hall Layout[id={self.id} uuid={self.uuid} name={self.name}]"
+
+
 class Show(BaseModel):
     """
        Show Model represents Show playing in theatre.
@@ -260,8 +314,71 @@ class Show(BaseModel):
         null=False, blank=False, on_delete=models.CASCADE,
     )
 
-    # class Meta:
-    #     db_table = 'smart_parser_parser'
+    # Ticket counters maintained in the same transaction as bookings, payments and releases.
+    seats_available = models.IntegerField(
+        verbose_name='Available Seats',
+        null=False, blank=False, default=0, editable=False,
+    )
+
+    seats_held = models.IntegerField(
+        verbose_name='Held Seats',
+        null=False, blank=False, default=0, editable=False,
+    )
+
+    seats_sold = models.IntegerField(
+        verbose_name='Sold Seats',
+        null=False, blank=False, default=0, editable=False,
+    )
+
+    # Dynamic pricing factor from occupancy and time to showtime, tickets cost base_price * price_factor
+    # * seat type price_multiplier. Maintained by PricingServices.
+    price_factor = models.FloatField(
+        verbose_name='Price Factor',
+        null=False, blank=False, default=1.0, editable=False,
+    )
+
+    # [start_time, start_time + movie length), kept in sync on save to prevent overlapping shows in a hall.
+    time_range = DateTimeRangeField(
+        verbose_name='Time Range',
+        null=True, blank=True, editable=False,
+    )
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            ExclusionConstraint(
+                name='exclude_overlapping_hall_shows',
+                expressions=[
+                    ('hall', RangeOperators.EQUAL),
+                    ('time_range', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
+    @property
+    def sold_out(self):
+        return Show.is_sold_out(self.seats_available, self.seats_held, self.seats_sold)
+
+    @staticmethod
+    def is_sold_out(seats_available, seats_held, seats_sold):
+        return seats_available == 0 and seats_held + seats_sold > 0
+
+    @staticmethod
+    def get_time_range(start_time, length):
+        return DateTimeTZRange(start_time, start_time + timedelta(minutes=length))
+
+    seat_counter_fields = ('seats_available', 'seats_held', 'seats_sold')
+    # Fields only ever changed with set based updates, so a stale instance must not write them back.
+    managed_fields = seat_counter_fields + ('price_factor',)
+
+    def save(self, *args, **kwargs):
+        self.time_range = Show.get_time_range(self.start_time, self.movie.length)
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in Show.managed_fields
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Show [id={self.id} uuid={self.uuid} start time={self.start_time}]"
@@ -286,8 +403,14 @@ class Booking(BaseModel):
         models.CharField(max_length=100, blank=False)
     )
 
-    # class Meta:
-    #     db_table = 'smart_parser_parser'
+    class Meta(BaseModel.Meta):
+        indexes = BaseModel.Meta.indexes + [
+            # Used by expired booking sweeper to find unpaid bookings without scanning paid ones.
+            models.Index(
+                fields=['modified'], name='booking_unpaid_modified_idx',
+                condition=models.Q(paid=False, is_deleted=False),
+            ),
+        ]
 
     def __str__(self):
         return f"Booking [id={self.id} uuid={self.uuid} price={self.price}]"
@@ -325,8 +448,104 @@ class Ticket(BaseModel):
         null=True, blank=True, default=None, on_delete=models.SET_NULL,
     )
 
-    # class Meta:
-    #     db_table = 'smart_parser_parser'
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['show', 'seat'], name='unique_show_seat_ticket'),
+        ]
 
     def __str__(self):
         return f"Ticket [id={self.id} uuid={self.uuid} price={self.price}]"
+
+
+class ShowListing(models.Model):
+    """
+       ShowListing Model is a denormalized read model of upcoming shows, one row per show,
+       looked up by city, date and movie. Maintained by ShowListingServices.
+    """
+
+    show = models.OneToOneField(
+        Show,
+        verbose_name='Show',
+        related_name='listing',
+        primary_key=True, on_delete=models.CASCADE,
+    )
+
+    city = models.CharField(
+        verbose_name='Theatre City',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    date = models.DateField(
+        verbose_name='Show Date',
+        null=False, blank=False,
+    )
+
+    start_time = models.DateTimeField(
+        verbose_name='Start Time',
+        null=False, blank=False
+    )
+
+    movie = models.ForeignKey(
+        Movie,
+        verbose_name='Movie',
+        related_name='listings',
+        null=False, blank=False, on_delete=models.CASCADE,
+    )
+
+    movie_name = models.CharField(
+        verbose_name='Movie Name',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    movie_genre = models.CharField(
+        verbose_name='Genre of Movie',
+        null=True, blank=True,
+        max_length=100,
+    )
+
+    movie_certificate = models.CharField(
+        verbose_name='Certificate of Movie',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    movie_length = models.FloatField(
+        verbose_name='Movie Length',
+        null=False, blank=False,
+    )
+
+    theatre = models.ForeignKey(
+        Theatre,
+        verbose_name='Theatre',
+        related_name='listings',
+        null=False, blank=False, on_delete=models.CASCADE,
+    )
+
+    theatre_name = models.CharField(
+        verbose_name='Theatre Name',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    hall = models.ForeignKey(
+        Hall,
+        verbose_name='Hall',
+        related_name='listings',
+        null=False, blank=False, on_delete=models.CASCADE,
+    )
+
+    hall_name = models.CharField(
+        verbose_name='Hall Name',
+        null=False, blank=False,
+        max_length=100,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city', 'date', 'movie'], name='show_listing_city_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Show Listing [show={self.show_id} city={self.city} date={self.date}]"
@@ -0,0 +1,194 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """
+    Number of rows postgres planner expects `queryset` to return, from EXPLAIN.
+    For an unfiltered table this is `pg_class.reltuples`, for a filtered one it applies column statistics.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_count(queryset, threshold=None):
+    """
+    Returns (count, is_estimate). Counts exactly when planner estimates less than `threshold` rows,
+    else returns the estimate without running COUNT(*).
+    """
+    if threshold is None:
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+    estimate = estimate_count(queryset)
+    if estimate < threshold:
+        return queryset.count(), False
+    return estimate, True
+
+
+class CreatedCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created, id), newest first, or over the `?ordering=` fields followed by id.
+
+    The cursor holds all ordering values of the last row seen. Id makes every position unique, so pages
+    never fall back to DRF's offsets, and each page is one index range scan on (created, id) filtered with
+    a row comparison no matter how deep the client has paged or how many rows share a `created`.
+    """
+    ordering = ('-created', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        names = [field.lstrip('-') for field in ordering]
+        if 'id' in names:
+            # Fields after the unique id never decide the order.
+            return ordering[:names.index('id') + 1]
+        return ordering + ('-id' if ordering[0].startswith('-') else 'id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        # Previous pages are read backwards from the cursor and reversed again below.
+        ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering) \
+            if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.filter_after(queryset, ordering, self.decode_position(position))
+
+        # One extra row tells whether there is a page after this one.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) \
+            if len(results) > self.page_size else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following is not None, following
+        else:
+            self.has_next, self.next_position = following is not None, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_after(self, queryset, ordering, values):
+        """Rows strictly after `values` of `ordering` fields in that ordering."""
+        fields = [self.model._meta.get_field(field.lstrip('-')) for field in ordering]
+        descending = {field.startswith('-') for field in ordering}
+        if len(descending) == 1 and None not in values:
+            # Same direction on every field: one row comparison, which postgres turns into an index range.
+            quote = connections[queryset.db].ops.quote_name
+            table = quote(self.model._meta.db_table)
+            columns = ', '.join(f'{table}.{quote(field.column)}' for field in fields)
+            placeholders = ', '.join(['%s'] * len(values))
+            operator = '<' if descending.pop() else '>'
+            return queryset.extra(where=[f'({columns}) {operator} ({placeholders})'], params=values)
+
+        # Mixed directions or NULLs: expand the comparison field by field, postgres puts NULLs last
+        # in ascending and first in descending order.
+        after, equal = Q(), Q()
+        for field, order, value in reversed(list(zip(fields, ordering, values))):
+            name = field.attname
+            if value is None:
+                before = Q(**{f'{name}__isnull': False}) if order.startswith('-') else Q()
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                if order.startswith('-'):
+                    before = Q(**{f'{name}__lt': value})
+                else:
+                    before = Q(**{f'{name}__gt': value})
+                    if field.null:
+                        before |= Q(**{f'{name}__isnull': True})
+                equal = Q(**{name: value})
+            after = before | (equal & after) if after else before
+        return queryset.filter(after)
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page \
+            else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page \
+            else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            # `.values()` rows hold foreign keys under the field name, instances under its attname.
+            field = self.model._meta.get_field(order.lstrip('-'))
+            value = instance[field.name] if isinstance(instance, dict) else getattr(instance, field.attname)
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
+
+
+class EstimatedCountCursorPagination(CreatedCursorPagination):
+    """
+    Cursor pagination which also returns total `count` of the filtered queryset.
+    Count is exact for small results and planner estimated above PAGINATION_COUNT_ESTIMATE_THRESHOLD,
+    `count_is_estimate` tells which one it is.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_is_estimate = get_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'count': self.count,
+            'count_is_estimate': self.count_is_estimate,
+            'results': data,
+        })
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator using `get_count`, for admin changelists of huge tables.
+    Use together with `show_full_result_count = False`.
+    """
+
+    @cached_property
+    def count(self):
+        return get_count(self.object_list)[0]
@@ -6,6 +6,8 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+from bmm.bookings.services import HallLayoutServices, InvalidLayout, ShowServices
+from bmm.utils.serializers import BulkListSerializer, BulkSerializerMixin, DynamicFieldsMixin, ValuesSerializer
 from bmm.bookings.models import (
     Movie,
     Theatre,
@@ -14,14 +16,16 @@ from bmm.bookings.models import (
     Seat,
     Show,
     Booking,
-    Ticket
+    Ticket,
+    ShowListing,
+    HallLayout,
 )
 
 default_fields = ['id', 'uuid', 'created', 'modified', ]
 default_readonly_fields = ['id', 'uuid', 'created', 'modified']
 
 
-class MovieSerializer(ModelSerializer):
+class MovieSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = Movie
         model_specific_fields = [
@@ -36,9 +40,10 @@ class MovieSerializer(ModelSerializer):
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
 
 
-class TheatreSerializer(ModelSerializer):
+class TheatreSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = Theatre
         model_specific_fields = [
@@ -47,9 +52,10 @@ class TheatreSerializer(ModelSerializer):
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
 
 
-class HallSerializer(ModelSerializer):
+class HallSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = Hall
         model_specific_fields = [
@@ -58,9 +64,11 @@ class HallSerializer(ModelSerializer):
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
+        expandable_fields = {'theatre': 'TheatreSerializer'}
 
 
-class SeatTypeSerializer(ModelSerializer):
+class SeatTypeSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = SeatType
         model_specific_fields = [
@@ -70,9 +78,11 @@ class SeatTypeSerializer(ModelSerializer):
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
+        expandable_fields = {'theatre': 'TheatreSerializer'}
 
 
-class SeatSerializer(ModelSerializer):
+class SeatSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = Seat
         model_specific_fields = [
@@ -80,12 +90,92 @@ class SeatSerializer(ModelSerializer):
             'column',
             'seat_type',
             'hall',
+            'score',
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
+        expandable_fields = {'seat_type': 'SeatTypeSerializer', 'hall': 'HallSerializer'}
 
 
-class ShowSerializer(ModelSerializer):
+class HallLayoutSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
+
+    def validate(self, data):
+        # Seat count is stored on write so lists do not expand every layout.
+        if 'spec' in data:
+            try:
+                data['seat_count'] = len(HallLayoutServices.expand(data['spec']))
+            except InvalidLayout as e:
+                raise ValidationError({'spec': str(e)})
+        return data
+
+    class Meta:
+        model = HallLayout
+        model_specific_fields = [
+            'name',
+            'spec',
+            'seat_count',
+        ]
+        fields = default_fields + model_specific_fields
+        read_only_fields = default_readonly_fields + ['seat_count']
+        list_serializer_class = BulkListSerializer
+
+
+class HallLayoutApplySerializer(serializers.Serializer):
+    halls = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=settings.BATCH_MAX_SIZE
+    )
+
+
+class ShowBulkListSerializer(BulkListSerializer):
+    derived_fields = ['time_range']
+
+    def validate(self, attrs):
+        """
+        Checks time ranges of the whole batch against each other and existing shows, one sweep per hall.
+        """
+        instances = self.instance if isinstance(self.instance, list) else [None] * len(attrs)
+        halls = {}
+        for instance, data in zip(instances, attrs):
+            start_time = data.get('start_time', getattr(instance, 'start_time', None))
+            # Movies of instances are selected with them (see ShowViewSet.get_bulk_queryset).
+            movie = data.get('movie', getattr(instance, 'movie', None))
+            hall_id = data['hall'].id if 'hall' in data else instance.hall_id
+            time_ranges, show_ids = halls.setdefault(hall_id, ([], []))
+            time_ranges.append(Show.get_time_range(start_time, movie.length))
+            if instance is not None:
+                show_ids.append(instance.id)
+
+        conflicts = []
+        for hall_id, (time_ranges, show_ids) in halls.items():
+            conflicts += ShowServices.find_conflicts(hall_id, time_ranges, exclude_show_ids=show_ids)
+        if conflicts:
+            raise ValidationError({'conflicts': conflicts})
+        return attrs
+
+    def prepare(self, instance):
+        instance.time_range = Show.get_time_range(instance.start_time, instance.movie.length)
+
+
+class ShowSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
+    sold_out = serializers.BooleanField(read_only=True)
+
+    def validate(self, data):
+        # Batches are checked at once by ShowBulkListSerializer.
+        if isinstance(self.parent, ShowBulkListSerializer):
+            return data
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        movie = data.get('movie', getattr(self.instance, 'movie', None))
+        hall = data.get('hall', getattr(self.instance, 'hall', None))
+        conflicts = ShowServices.find_conflicts(
+            hall.id,
+            [Show.get_time_range(start_time, movie.length)],
+            exclude_show_ids=[self.instance.id] if self.instance is not None else [],
+        )
+        if conflicts:
+            raise ValidationError({'conflicts': conflicts})
+        return data
+
     class Meta:
         model = Show
         model_specific_fields = [
@@ -93,12 +183,34 @@ class ShowSerializer(ModelSerializer):
             'base_price',
             'movie',
             'hall',
+            'seats_available',
+            'seats_held',
+            'seats_sold',
+            'sold_out',
+            'price_factor',
         ]
         fields = default_fields + model_specific_fields
-        read_only_fields = default_readonly_fields
+        read_only_fields = default_readonly_fields + ['seats_available', 'seats_held', 'seats_sold', 'price_factor']
+        list_serializer_class = ShowBulkListSerializer
+        expandable_fields = {'movie': 'MovieSerializer', 'hall': 'HallSerializer'}
+
+
+class ShowValuesSerializer(ValuesSerializer):
+    serializer_class = ShowSerializer
+    computed_fields = {
+        'sold_out': (Show.seat_counter_fields, Show.is_sold_out),
+    }
+
 
+class BookingSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
+
+    def validate_ticket_ids(self, ticket_ids):
+        if not ticket_ids:
+            raise ValidationError("At least one ticket is required for booking.")
+        if not all(ticket_id.isdigit() for ticket_id in ticket_ids):
+            raise ValidationError("Ticket ID's must be integers.")
+        return ticket_ids
 
-class BookingSerializer(ModelSerializer):
     class Meta:
         model = Booking
         model_specific_fields = [
@@ -108,9 +220,11 @@ class BookingSerializer(ModelSerializer):
         ]
         fields = default_fields + model_specific_fields
         read_only_fields = default_readonly_fields
+        list_serializer_class = BulkListSerializer
+        expandable_fields = {'tickets': 'TicketSerializer'}
 
 
-class TicketSerializer(ModelSerializer):
+class TicketSerializer(DynamicFieldsMixin, BulkSerializerMixin, ModelSerializer):
     class Meta:
         model = Ticket
         model_specific_fields = [
@@ -120,4 +234,86 @@ class TicketSerializer(ModelSerializer):
             'booking',
         ]
         fields = default_fields + model_specific_fields
-        read_only_fields = default_readonly_fields
+        # Tickets are only ever claimed and released by BookingServices, which keeps seat counters in step.
+        read_only_fields = default_readonly_fields + ['booking']
+        list_serializer_class = BulkListSerializer
+        expandable_fields = {'show': 'ShowSerializer', 'seat': 'SeatSerializer', 'booking': 'BookingSerializer'}
+
+
+class TicketValuesSerializer(ValuesSerializer):
+    serializer_class = TicketSerializer
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    token = serializers.CharField(read_only=True)
+    show = serializers.IntegerField()
+    ticket_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    expires_in = serializers.IntegerField(read_only=True)
+
+
+class BestAvailableSerializer(serializers.Serializer):
+    show = serializers.PrimaryKeyRelatedField(queryset=Show.objects.all())
+    count = serializers.IntegerField(min_value=1, max_value=settings.BEST_AVAILABLE_MAX_SEATS)
+    seat_type = serializers.PrimaryKeyRelatedField(queryset=SeatType.objects.all(), required=False)
+    hold = serializers.CharField(required=False)
+
+
+class TicketRepriceSerializer(serializers.Serializer):
+    shows = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=settings.BATCH_MAX_SIZE
+    )
+    theatres = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=settings.BATCH_MAX_SIZE
+    )
+    seat_types = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=settings.BATCH_MAX_SIZE
+    )
+
+    def validate(self, data):
+        if not any(data.get(field, None) for field in ['shows', 'theatres', 'seat_types']):
+            raise serializers.ValidationError("At least one of `shows`, `theatres` or `seat_types` is required.")
+        return data
+
+
+class TicketQuoteSerializer(serializers.Serializer):
+    selections = serializers.ListField(
+        child=serializers.ListField(
+            child=serializers.IntegerField(), allow_empty=False, max_length=settings.BATCH_MAX_SIZE
+        ),
+        allow_empty=False, max_length=settings.QUOTE_MAX_SELECTIONS,
+    )
+    hold = serializers.CharField(required=False)
+
+
+class ShowScheduleSerializer(serializers.Serializer):
+    movie = serializers.PrimaryKeyRelatedField(queryset=Movie.objects.all())
+    hall = serializers.PrimaryKeyRelatedField(queryset=Hall.objects.all())
+    base_price = serializers.FloatField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    start_times = serializers.ListField(child=serializers.TimeField(), allow_empty=False)
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise ValidationError("End date must not be before start date.")
+        if (data['end_date'] - data['start_date']).days >= settings.SHOW_SCHEDULE_MAX_DAYS:
+            raise ValidationError(f"Shows can be scheduled for at most {settings.SHOW_SCHEDULE_MAX_DAYS} days at once.")
+        return data
+
+
+class ShowListingSerializer(ModelSerializer):
+    remaining_seats = serializers.IntegerField(source='show.seats_available')
+    sold_out = serializers.BooleanField(source='show.sold_out')
+    theatre = serializers.SerializerMethodField()
+    hall = serializers.SerializerMethodField()
+
+    def get_theatre(self, listing):
+        return {'id': listing.theatre_id, 'name': listing.theatre_name}
+
+    def get_hall(self, listing):
+        return {'id': listing.hall_id, 'name': listing.hall_name}
+
+    class Meta:
+        model = ShowListing
+        fields = ['show', 'start_time', 'remaining_seats', 'sold_out', 'theatre', 'hall']
+        read_only_fields = fields
@@ -1,11 +1,29 @@
+import base64
+import heapq
+import json
+import re
 import time
+import uuid
+from datetime import datetime, timedelta
+
 from celery.utils.log import get_task_logger
 from celery import shared_task, chord, chain, group
+from celery.result import GroupResult
+from celery.utils import uuid as celery_uuid
+from redis.exceptions import RedisError
 
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Sum
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+
 
+import numpy as np
+from psycopg2.extras import DateTimeTZRange
 
+from bmm.utils.cache import bump_generations, get_redis_connection
 from bmm.bookings.models import (
     Movie,
     Theatre,
@@ -14,7 +32,9 @@ from bmm.bookings.models import (
     Seat,
     Show,
     Booking,
-    Ticket
+    Ticket,
+    ShowListing,
+    HallLayout,
 )
 
 
@@ -24,42 +44,235 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+class TicketsUnavailable(Exception):
+    """
+        Raised when some of the requested tickets are already booked or do not exist.
+    """
+
+    def __init__(self, ticket_ids):
+        super().__init__(f"Tickets with ID's: {ticket_ids} are not available.")
+        self.ticket_ids = ticket_ids
+
+
+class HoldNotFound(Exception):
+    """
+        Raised when a seat hold does not exist or has already expired.
+    """
+
+    def __init__(self, token):
+        super().__init__(f"Seat hold: {token} does not exist or has expired.")
+        self.token = token
+
+
+class InvalidLayout(Exception):
+    """
+        Raised when a hall layout spec is malformed or cannot be applied to a hall.
+    """
+
+
+class ShowConflict(Exception):
+    """
+        Raised when shows overlap with each other or with existing shows of the same hall.
+    """
+
+    def __init__(self, conflicts):
+        super().__init__(f"Shows overlap with other shows in the hall: {conflicts}")
+        self.conflicts = conflicts
+
+
+# Price of a ticket of show `sh` for a seat of seat type `st`, rounded to cents. Every writer of ticket
+# prices uses it (or `round_prices` for numpy), so writers agree on prices and do not undo each other.
+TICKET_PRICE_SQL = "round((sh.base_price * sh.price_factor * st.price_multiplier)::numeric, 2)::double precision"
+
+
+def round_prices(prices):
+    """
+    Rounds a numpy array of prices to cents half away from zero, as numeric round() of TICKET_PRICE_SQL.
+    The tiny bias stands in for the 15 significant digits double precision is cast to numeric with.
+    """
+    return np.floor(prices * 100 + 0.5 + 1e-9) / 100
+
+
+def column_key(column):
+    """Sort key ordering numeric seat columns by number and the rest after them by name."""
+    return (0, int(column), '') if column.isdigit() else (1, 0, column)
+
+
 class TicketServices:
 
     @staticmethod
     @shared_task(name="create_tickets_for_show", time_limit=60 * 30, soft_time_limit=60 * 30)
     def create_tickets_for_show(show_id):
+        return TicketServices.create_tickets_for_shows([show_id])
 
-        show = Show.objects.get(id=show_id)
-        seats = show.hall.seats.all()
+    @staticmethod
+    @shared_task(name="create_tickets_for_shows", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def create_tickets_for_shows_task(show_ids):
+        return TicketServices.create_tickets_for_shows(show_ids)
 
-        tickets = []
-        for seat in seats:
-            ticket = Ticket(
-                show=show,
-                seat=seat,
-                price=show.base_price * seat.seat_type.price_multiplier
+    @staticmethod
+    def create_tickets_for_shows(show_ids):
+        """
+        Creates a ticket for every seat of the hall of each show in `show_ids`.
+
+        Tickets are inserted straight from the seats joined with their seat type in one
+        INSERT ... SELECT, skipping the (show, seat) pairs which already have a ticket and deleted
+        shows, seats and seat types. Safe to re-run for the same shows.
+        Returns number of tickets created.
+        """
+        show_ids = list(show_ids)
+        logger.info(f"Creating tickets for shows with ID: {show_ids}")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Ticket._meta.db_table} (created, modified, uuid, is_deleted, price, show_id, seat_id)"
+                f" SELECT now(), now(), gen_random_uuid(), false, {TICKET_PRICE_SQL}, sh.id, s.id"
+                f" FROM {Show._meta.db_table} sh"
+                f" JOIN {Seat._meta.db_table} s ON s.hall_id = sh.hall_id AND NOT s.is_deleted"
+                f" JOIN {SeatType._meta.db_table} st ON st.id = s.seat_type_id AND NOT st.is_deleted"
+                f" WHERE sh.id = ANY(%s) AND NOT sh.is_deleted"
+                f" ON CONFLICT (show_id, seat_id) DO NOTHING",
+                [show_ids]
             )
-            tickets.append(ticket)
+            created = cursor.rowcount
 
-        Ticket.objects.bulk_create(tickets)
+        ShowServices.reconcile_seat_counts(show_ids)
+        for show_id in show_ids:
+            SeatMapServices.invalidate(show_id)
+        ShowListingServices.refresh(show_ids)
+        logger.info(f"Created {created} tickets for shows with ID: {show_ids}")
+        return created
 
     @staticmethod
-    def book_tickets(ticket_ids, booking_id):
-        logger.info(f"Booking tickets with ID: {ticket_ids} for Booking ID: {booking_id}")
-        booking = Booking.objects.get(id=booking_id)
-        total_price = 0
+    def claim_tickets(ticket_ids, booking_id):
+        """
+        Claims all `ticket_ids` for `booking_id` with a single conditional UPDATE.
 
-        tickets = []
-        for ticket_id in ticket_ids:
-            ticket = Ticket.objects.get(id=ticket_id)
-            ticket.booking = booking
-            tickets.append(ticket)
-            total_price += ticket.price
+        Only tickets which are not booked yet are claimed, so two concurrent bookings can never
+        both get the same ticket. Raises TicketsUnavailable if any ticket could not be claimed,
+        caller is expected to roll back the surrounding transaction in that case.
+        Returns list of (ticket_id, price, show_id) tuples for the claimed tickets.
+        """
+        ticket_ids = sorted(set(int(ticket_id) for ticket_id in ticket_ids))
+        logger.info(f"Claiming tickets with ID: {ticket_ids} for Booking ID: {booking_id}")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Ticket._meta.db_table} SET booking_id = %s, modified = now()"
+                f" WHERE id = ANY(%s) AND booking_id IS NULL AND is_deleted = false"
+                f" RETURNING id, price, show_id",
+                [booking_id, ticket_ids]
+            )
+            claimed = cursor.fetchall()
+
+        if len(claimed) < len(ticket_ids):
+            claimed_ids = {ticket_id for ticket_id, _, _ in claimed}
+            raise TicketsUnavailable([ticket_id for ticket_id in ticket_ids if ticket_id not in claimed_ids])
+
+        return claimed
+
+    @staticmethod
+    def release_tickets(booking_ids):
+        """
+        Frees all tickets of given bookings with a single UPDATE.
+        Returns list of (ticket_id, show_id, paid) tuples for the released tickets,
+        `paid` telling whether the booking the ticket was released from was paid.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Ticket._meta.db_table} t SET booking_id = NULL, modified = now()"
+                f" FROM {Booking._meta.db_table} b"
+                f" WHERE b.id = t.booking_id AND t.booking_id = ANY(%s)"
+                f" RETURNING t.id, t.show_id, b.paid",
+                [list(booking_ids)]
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def reprice_tickets(show_ids=None, theatre_ids=None, seat_type_ids=None, seat_ids=None):
+        """
+        Recomputes price of unsold tickets of upcoming shows as show base price times its price factor
+        times seat type multiplier, with one UPDATE ... FROM join. Tickets are limited to the given shows,
+        theatres, seat types and seats (all of them if None) and booked tickets keep the price they were
+        booked at.
+        Returns number of repriced tickets.
+        """
+        filters, params = [], []
+        scopes = [('t.show_id', show_ids), ('st.theatre_id', theatre_ids), ('st.id', seat_type_ids), ('s.id', seat_ids)]
+        for column, ids in scopes:
+            if ids is not None:
+                filters.append(f"AND {column} = ANY(%s)")
+                params.append(list(ids))
+
+        with connection.cursor() as cursor:
+            # Repriced rows are counted per show in the database, only one row per show comes back.
+            cursor.execute(
+                f"""
+                WITH updated AS (
+                    UPDATE {Ticket._meta.db_table} t
+                    SET price = {TICKET_PRICE_SQL}, modified = now()
+                    FROM {Show._meta.db_table} sh, {Seat._meta.db_table} s, {SeatType._meta.db_table} st
+                    WHERE sh.id = t.show_id AND s.id = t.seat_id AND st.id = s.seat_type_id
+                    AND t.booking_id IS NULL AND NOT t.is_deleted AND NOT sh.is_deleted AND sh.start_time > now()
+                    AND t.price IS DISTINCT FROM {TICKET_PRICE_SQL}
+                    {' '.join(filters)}
+                    RETURNING t.show_id
+                )
+                SELECT show_id, count(*) FROM updated GROUP BY show_id ORDER BY show_id
+                """,
+                params
+            )
+            counts = cursor.fetchall()
+        repriced_show_ids = [show_id for show_id, _ in counts]
+        repriced = sum(count for _, count in counts)
+
+        # Cached seat map layouts carry ticket prices.
+        for show_id in repriced_show_ids:
+            transaction.on_commit(lambda show_id=show_id: SeatMapServices.invalidate(show_id))
+        logger.info(f"Repriced {repriced} tickets of shows with ID: {repriced_show_ids}")
+        return repriced
+
+    @staticmethod
+    def _quoted_tickets(ticket_ids):
+        """(id, show id, price, booking id) of tickets of `ticket_ids` which belong to upcoming shows."""
+        return list(
+            Ticket.objects.filter(id__in=ticket_ids, show__start_time__gt=timezone.now(), show__is_deleted=False)
+            .values_list('id', 'show_id', 'price', 'booking_id')
+        )
 
-        Ticket.objects.bulk_update(tickets, ['booking'])
+    @staticmethod
+    def quote_selections(selections, hold_token=None):
+        """
+        Availability and total price of every selection of `selections`, a list of ticket ID lists,
+        answered with one query over the union of their tickets and one cache read of their holds.
+        Tickets held by `hold_token` count as available, tickets of past or deleted shows are reported
+        missing like unknown ones. Returns one dict per selection, in order.
+        """
+        ticket_ids = sorted({ticket_id for selection in selections for ticket_id in selection})
+        tickets = {
+            ticket_id: (show_id, price, booking_id)
+            for ticket_id, show_id, price, booking_id in TicketServices._quoted_tickets(ticket_ids)
+        }
+        held = set(SeatHoldServices.held_by_others(
+            [(ticket_id, show_id) for ticket_id, (show_id, _, booking_id) in tickets.items() if booking_id is None],
+            hold_token,
+        ))
 
-        return total_price
+        quotes = []
+        for selection in selections:
+            selection = sorted(set(selection))
+            missing = [ticket_id for ticket_id in selection if ticket_id not in tickets]
+            booked = [ticket_id for ticket_id in selection if tickets.get(ticket_id, (None, None, None))[2] is not None]
+            held_by_others = [ticket_id for ticket_id in selection if ticket_id in held]
+            quotes.append({
+                'ticket_ids': selection,
+                'available': not (missing or booked or held_by_others),
+                'booking_price': sum(tickets[ticket_id][1] for ticket_id in selection if ticket_id in tickets),
+                'missing_ticket_ids': missing,
+                'already_booked_ticket_ids': booked,
+                'held_ticket_ids': held_by_others,
+            })
+        return quotes
 
     @staticmethod
     def check_availability(ticket_ids):
@@ -79,19 +292,1258 @@ class TicketServices:
 
 
 
+class SeatHoldServices:
+    """
+    Short lived seat holds kept in cache (redis in production) with native TTLs.
+
+    Every held ticket has its own key holding the hold token, which makes claiming a ticket an
+    atomic `add`. The hold itself is stored under the token so it can be extended or released.
+    Nothing is written to database until the hold is checked out into a Booking.
+    """
+
+    @staticmethod
+    def _hold_key(token):
+        return f"seat_hold:{token}"
+
+    @staticmethod
+    def _ticket_key(show_id, ticket_id):
+        return f"seat_hold:{show_id}:{ticket_id}"
+
+    @staticmethod
+    def _ticket_keys(hold):
+        return [SeatHoldServices._ticket_key(hold['show'], ticket_id) for ticket_id in hold['ticket_ids']]
+
+    @staticmethod
+    def hold(show_id, ticket_ids):
+        ticket_ids = sorted(set(ticket_ids))
+        available_ids = set(
+            Ticket.objects.filter(show_id=show_id, id__in=ticket_ids, booking__isnull=True)
+            .values_list('id', flat=True)
+        )
+        if len(available_ids) < len(ticket_ids):
+            raise TicketsUnavailable([ticket_id for ticket_id in ticket_ids if ticket_id not in available_ids])
+
+        token = uuid.uuid4().hex
+        ttl = settings.SEAT_HOLD_TTL
+        acquired = []
+        for ticket_id in ticket_ids:
+            key = SeatHoldServices._ticket_key(show_id, ticket_id)
+            if not cache.add(key, token, ttl):
+                cache.delete_many(acquired)
+                raise TicketsUnavailable([ticket_id])
+            acquired.append(key)
+
+        hold = {'token': token, 'show': show_id, 'ticket_ids': ticket_ids}
+        cache.set(SeatHoldServices._hold_key(token), hold, ttl)
+        logger.info(f"Holding tickets with ID: {ticket_ids} of show: {show_id} with hold: {token}")
+        return dict(hold, expires_in=ttl)
+
+    @staticmethod
+    def get(token):
+        hold = cache.get(SeatHoldServices._hold_key(token))
+        if hold is None:
+            raise HoldNotFound(token)
+        return hold
+
+    @staticmethod
+    def extend(token):
+        hold = SeatHoldServices.get(token)
+        ttl = settings.SEAT_HOLD_TTL
+        for key in SeatHoldServices._ticket_keys(hold) + [SeatHoldServices._hold_key(token)]:
+            if not cache.touch(key, ttl):
+                SeatHoldServices.release(token)
+                raise HoldNotFound(token)
+        return dict(hold, expires_in=ttl)
+
+    @staticmethod
+    def release(token):
+        hold = cache.get(SeatHoldServices._hold_key(token))
+        if hold is None:
+            return
+        # Only delete ticket keys still owned by this hold, they may have expired and been held by others.
+        ticket_keys = SeatHoldServices._ticket_keys(hold)
+        owned = [key for key, value in cache.get_many(ticket_keys).items() if value == token]
+        cache.delete_many(owned + [SeatHoldServices._hold_key(token)])
+        logger.info(f"Released hold: {token}")
+
+    @staticmethod
+    def held_by_others(tickets, token=None):
+        """
+        Returns ID's of tickets held by a hold other than `token`.
+        `tickets` is an iterable of (ticket_id, show_id) tuples.
+        """
+        keys = {SeatHoldServices._ticket_key(show_id, ticket_id): ticket_id for ticket_id, show_id in tickets}
+        holders = cache.get_many(list(keys))
+        return sorted(keys[key] for key, holder in holders.items() if holder != token)
+
+
+class SeatMapServices:
+    """
+    Seat map of a show: the hall layout plus packed bitsets of sold and held seats.
+
+    Layout (one entry per ticket ordered by seat row and column) is cached as a whole. Sold seats
+    are kept in a redis bitmap where bit N belongs to the Nth seat of the layout; bookings set
+    and releases clear bits once committed. Held seats are read from seat hold keys.
+    Bitsets are packed most significant bit first, same as redis SETBIT, and base64 encoded.
+    """
+    layout_fields = ['ticket', 'seat', 'row', 'column', 'seat_type', 'price']
+
+    # Only touch the bitmap if it is already built, a partial bitmap would report seats as free.
+    _mark_script = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+        for i = 2, #ARGV do redis.call('SETBIT', KEYS[1], ARGV[i], ARGV[1]) end
+        return 1
+    """
+
+    @staticmethod
+    def _layout_key(show_id):
+        return f"seatmap:layout:{show_id}"
+
+    @staticmethod
+    def _sold_key(show_id):
+        return f"bmm:seatmap:sold:{show_id}"
+
+    @staticmethod
+    def _pack(size, offsets):
+        bits = bytearray((size + 7) // 8)
+        for offset in offsets:
+            bits[offset // 8] |= 0x80 >> (offset % 8)
+        return bytes(bits)
+
+    @staticmethod
+    def _load(show_id):
+        rows = list(
+            Ticket.objects.filter(show_id=show_id)
+            .order_by('seat__row', 'seat__column', 'id')
+            .values_list('id', 'seat_id', 'seat__row', 'seat__column', 'seat__seat_type_id', 'price', 'booking_id')
+        )
+        layout = [list(row[:-1]) for row in rows]
+        sold = SeatMapServices._pack(len(rows), [offset for offset, row in enumerate(rows) if row[-1] is not None])
+        return layout, sold
+
+    @staticmethod
+    def _store_sold(redis, show_id, layout, sold):
+        """
+        Stores a sold seats bitmap loaded from the database, unless another one was stored meanwhile.
+
+        Bookings committed while the bitmap was missing could not mark it, so once it is stored (and
+        `mark_tickets` applies to it) sold tickets are read again and set on top of it. Bits are only
+        ever set here, a release racing the rebuild keeps its seat sold until the bitmap expires.
+        Returns the bitmap to serve.
+        """
+        key = SeatMapServices._sold_key(show_id)
+        try:
+            redis.set(key, sold, ex=settings.SEATMAP_CACHE_TTL, nx=True)
+            sold_ticket_ids = set(
+                Ticket.objects.filter(show_id=show_id, booking__isnull=False).values_list('id', flat=True)
+            )
+            offsets = [offset for offset, seat in enumerate(layout) if seat[0] in sold_ticket_ids]
+            if offsets:
+                redis.eval(SeatMapServices._mark_script, 1, key, 1, *offsets)
+            return redis.get(key) or SeatMapServices._pack(len(layout), offsets)
+        except RedisError:
+            logger.exception(f"Could not write sold seats bitmap of show: {show_id}")
+            return sold
+
+    @staticmethod
+    def seatmap(show_id):
+        layout = cache.get(SeatMapServices._layout_key(show_id))
+        sold = None
+        redis = get_redis_connection()
+
+        if layout is not None and redis is not None:
+            try:
+                sold = redis.get(SeatMapServices._sold_key(show_id))
+            except RedisError:
+                logger.exception(f"Could not read sold seats bitmap of show: {show_id}")
+
+        if layout is None or sold is None:
+            layout, sold = SeatMapServices._load(show_id)
+            # Tickets are created asynchronously, do not cache the layout of a show without tickets.
+            if layout:
+                cache.set(SeatMapServices._layout_key(show_id), layout, settings.SEATMAP_CACHE_TTL)
+                if redis is not None:
+                    sold = SeatMapServices._store_sold(redis, show_id, layout, sold)
+
+        size = len(layout)
+        # Redis drops trailing zero bytes of a bitmap which never had those bits set.
+        sold = sold.ljust((size + 7) // 8, b'\0')
+        hold_keys = {SeatHoldServices._ticket_key(show_id, seat[0]): offset for offset, seat in enumerate(layout)}
+        held = SeatMapServices._pack(size, [hold_keys[key] for key in cache.get_many(list(hold_keys))])
+
+        return {
+            'show': show_id,
+            'size': size,
+            'fields': SeatMapServices.layout_fields,
+            'seats': layout,
+            'sold': base64.b64encode(sold).decode(),
+            'held': base64.b64encode(held).decode(),
+        }
+
+    @staticmethod
+    def mark_tickets(tickets, sold=True):
+        """
+        Sets or clears sold bits of `tickets`, an iterable of (ticket_id, show_id) tuples.
+        """
+        redis = get_redis_connection()
+        if redis is None:
+            return
+
+        ticket_ids_by_show = {}
+        for ticket_id, show_id in tickets:
+            ticket_ids_by_show.setdefault(show_id, set()).add(ticket_id)
+
+        for show_id, ticket_ids in ticket_ids_by_show.items():
+            layout = cache.get(SeatMapServices._layout_key(show_id))
+            try:
+                if layout is None:
+                    redis.delete(SeatMapServices._sold_key(show_id))
+                    continue
+                offsets = [offset for offset, seat in enumerate(layout) if seat[0] in ticket_ids]
+                redis.eval(
+                    SeatMapServices._mark_script, 1, SeatMapServices._sold_key(show_id), int(sold), *offsets
+                )
+            except RedisError:
+                logger.exception(f"Could not update sold seats bitmap of show: {show_id}")
+
+    @staticmethod
+    def invalidate(show_id):
+        cache.delete(SeatMapServices._layout_key(show_id))
+        redis = get_redis_connection()
+        if redis is not None:
+            try:
+                redis.delete(SeatMapServices._sold_key(show_id))
+            except RedisError:
+                logger.exception(f"Could not delete sold seats bitmap of show: {show_id}")
+
+
+class MovieServices:
+
+    @staticmethod
+    def facets(queryset, top_cast=10):
+        """
+        Counts movies of `queryset` per genre, per certificate and per cast member in one
+        GROUPING SETS query. Only `top_cast` most frequent cast members are returned.
+        """
+        response = {'genre': [], 'certificate': [], 'cast': []}
+        try:
+            movies_sql, params = queryset.order_by().values('id').query.sql_with_params()
+        except EmptyResultSet:
+            return response
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT kind, value, total FROM (
+                    SELECT
+                        CASE WHEN GROUPING(m.genre) = 0 THEN 'genre'
+                             WHEN GROUPING(m.certificate) = 0 THEN 'certificate'
+                             ELSE 'cast' END AS kind,
+                        CASE WHEN GROUPING(m.genre) = 0 THEN m.genre
+                             WHEN GROUPING(m.certificate) = 0 THEN m.certificate
+                             ELSE c.member END AS value,
+                        count(DISTINCT m.id) AS total,
+                        row_number() OVER (
+                            PARTITION BY GROUPING(m.genre, m.certificate, c.member)
+                            ORDER BY count(DISTINCT m.id) DESC
+                        ) AS position
+                    FROM {Movie._meta.db_table} m
+                    LEFT JOIN LATERAL unnest(m."cast") AS c(member) ON true
+                    WHERE m.id IN ({movies_sql})
+                    GROUP BY GROUPING SETS ((m.genre), (m.certificate), (c.member))
+                    -- Movies without cast group under a NULL member, drop it before ranking cast members.
+                    HAVING GROUPING(c.member) = 1 OR c.member IS NOT NULL
+                ) facets
+                WHERE kind <> 'cast' OR position <= %s
+                ORDER BY kind, total DESC, value
+                """,
+                list(params) + [top_cast]
+            )
+            for kind, value, total in cursor.fetchall():
+                response[kind].append({'value': value, 'count': total})
+        return response
+
+
+class AutocompleteServices:
+    """
+    Prefix index of movie and theatre names in redis sorted sets.
+
+    Every prefix (up to AUTOCOMPLETE_MAX_PREFIX_LENGTH characters) of every word suffix of a name is a
+    sorted set per scope, holding ID's scored by popularity (number of booked tickets). Scope is `*`
+    for all cities plus the theatre's city, or for movies the cities they have upcoming shows in.
+    Indexed names are kept in a hash per kind, so suggestions are answered from redis alone.
+    When the cache is not redis backed, suggestions fall back to a database prefix query.
+    """
+    MOVIE = 'movie'
+    THEATRE = 'theatre'
+    ALL_CITIES = '*'
+
+    @staticmethod
+    def _normalize(text):
+        return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+    @staticmethod
+    def _prefixes(name):
+        words = AutocompleteServices._normalize(name).split(' ')
+        prefixes = set()
+        for i in range(len(words)):
+            suffix = ' '.join(words[i:])[:settings.AUTOCOMPLETE_MAX_PREFIX_LENGTH]
+            prefixes.update(suffix[:length] for length in range(1, len(suffix) + 1) if suffix[length - 1] != ' ')
+        return prefixes
+
+    @staticmethod
+    def _prefix_key(kind, scope, prefix):
+        return f"bmm:ac:{kind}:{scope}:{prefix}"
+
+    @staticmethod
+    def _data_key(kind):
+        return f"bmm:ac:{kind}:data"
+
+    @staticmethod
+    def _index(pipe, kind, item, old_item=None):
+        """
+        Queues commands replacing `old_item` with `item` in the index. `item` of None removes `old_item`.
+        """
+        if old_item is not None:
+            for scope in old_item['scopes']:
+                for prefix in AutocompleteServices._prefixes(old_item['name']):
+                    pipe.zrem(AutocompleteServices._prefix_key(kind, scope, prefix), old_item['id'])
+            pipe.hdel(AutocompleteServices._data_key(kind), old_item['id'])
+        if item is not None:
+            for scope in item['scopes']:
+                for prefix in AutocompleteServices._prefixes(item['name']):
+                    pipe.zadd(AutocompleteServices._prefix_key(kind, scope, prefix), {item['id']: item['score']})
+            pipe.hset(AutocompleteServices._data_key(kind), item['id'], json.dumps(item))
+
+    @staticmethod
+    def _movie_items(movie_ids):
+        cities = {}
+        for movie_id, city in (
+            Show.objects.filter(movie_id__in=movie_ids, start_time__gte=timezone.now())
+            .values_list('movie_id', 'hall__theatre__city').distinct()
+        ):
+            cities.setdefault(movie_id, set()).add(AutocompleteServices._normalize(city))
+        scores = AutocompleteServices._popularity(AutocompleteServices.MOVIE, movie_ids)
+        return {
+            movie_id: {
+                'id': movie_id,
+                'name': name,
+                'scopes': [AutocompleteServices.ALL_CITIES] + sorted(cities.get(movie_id, [])),
+                'score': scores.get(movie_id, 0),
+            }
+            for movie_id, name in Movie.objects.filter(id__in=movie_ids).values_list('id', 'name')
+        }
+
+    @staticmethod
+    def _theatre_items(theatre_ids):
+        scores = AutocompleteServices._popularity(AutocompleteServices.THEATRE, theatre_ids)
+        return {
+            theatre_id: {
+                'id': theatre_id,
+                'name': name,
+                'city': city,
+                'scopes': [AutocompleteServices.ALL_CITIES, AutocompleteServices._normalize(city)],
+                'score': scores.get(theatre_id, 0),
+            }
+            for theatre_id, name, city in Theatre.objects.filter(id__in=theatre_ids).values_list('id', 'name', 'city')
+        }
+
+    @staticmethod
+    def _popularity(kind, ids):
+        """
+        Number of booked tickets per movie or theatre, in one aggregate query.
+        """
+        field = 'show__movie_id' if kind == AutocompleteServices.MOVIE else 'show__hall__theatre_id'
+        tickets = Ticket.objects.filter(booking__isnull=False, **{f"{field}__in": ids})
+        return dict(tickets.order_by().values_list(field).annotate(total=Count('id')))
+
+    @staticmethod
+    def reindex(kind, ids):
+        """
+        Brings index entries of movies or theatres with given `ids` in line with database,
+        removing entries of rows which were deleted.
+        """
+        redis = get_redis_connection()
+        if redis is None or not ids:
+            return
+
+        ids = list(ids)
+        if kind == AutocompleteServices.MOVIE:
+            items = AutocompleteServices._movie_items(ids)
+        else:
+            items = AutocompleteServices._theatre_items(ids)
+        try:
+            old_items = redis.hmget(AutocompleteServices._data_key(kind), ids)
+            pipe = redis.pipeline(transaction=False)
+            for item_id, old_item in zip(ids, old_items):
+                old_item = json.loads(old_item) if old_item else None
+                AutocompleteServices._index(pipe, kind, items.get(item_id), old_item)
+            pipe.execute()
+        except RedisError:
+            logger.exception(f"Could not update autocomplete index of {kind}: {ids}")
+
+    @staticmethod
+    @shared_task(name="rebuild_autocomplete_index", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def rebuild_index():
+        """
+        Reindexes all movies and theatres with fresh popularity scores and cities.
+        """
+        redis = get_redis_connection()
+        if redis is None:
+            return
+
+        for kind, model in [(AutocompleteServices.MOVIE, Movie), (AutocompleteServices.THEATRE, Theatre)]:
+            # Indexed ID's are included so entries of deleted rows get removed.
+            indexed_ids = {int(item_id) for item_id in redis.hkeys(AutocompleteServices._data_key(kind))}
+            ids = sorted(indexed_ids | set(model.objects.values_list('id', flat=True)))
+            for i in range(0, len(ids), 1000):
+                AutocompleteServices.reindex(kind, ids[i:i + 1000])
+            logger.info(f"Rebuilt autocomplete index of {len(ids)} {kind}s")
+
+    @staticmethod
+    def suggest(kind, query, city=None, limit=10):
+        prefix = AutocompleteServices._normalize(query)[:settings.AUTOCOMPLETE_MAX_PREFIX_LENGTH]
+        if not prefix:
+            return []
+        scope = AutocompleteServices._normalize(city) if city else AutocompleteServices.ALL_CITIES
+
+        redis = get_redis_connection()
+        if redis is not None:
+            try:
+                ids = redis.zrevrange(AutocompleteServices._prefix_key(kind, scope, prefix), 0, limit - 1)
+                if not ids:
+                    return []
+                items = redis.hmget(AutocompleteServices._data_key(kind), ids)
+                return [
+                    {key: value for key, value in json.loads(item).items() if key in ('id', 'name', 'city')}
+                    for item in items if item
+                ]
+            except RedisError:
+                logger.exception(f"Could not read autocomplete index of {kind}")
+
+        if kind == AutocompleteServices.MOVIE:
+            movies = Movie.objects.filter(name__istartswith=query)
+            if city:
+                movies = movies.filter(
+                    shows__hall__theatre__city__iexact=city, shows__start_time__gte=timezone.now()
+                ).distinct()
+            return [{'id': movie_id, 'name': name} for movie_id, name in movies.values_list('id', 'name')[:limit]]
+
+        theatres = Theatre.objects.filter(name__istartswith=query)
+        if city:
+            theatres = theatres.filter(city__iexact=city)
+        return [
+            {'id': theatre_id, 'name': name, 'city': theatre_city}
+            for theatre_id, name, theatre_city in theatres.values_list('id', 'name', 'city')[:limit]
+        ]
+
+
+class HallLayoutServices:
+    """
+    Hall layouts describe seating plans compactly as bands of rows sharing columns and seat type:
+
+        {"bands": [
+            {"rows": "A-E", "columns": "1-10,13-22", "gaps": [5], "seat_type": "Silver"},
+            {"rows": "F-H", "columns": "1-22", "seat_type": "Gold", "score": 2}
+        ]}
+
+    `rows` and `columns` are comma separated values or inclusive ranges of numbers or letters, `gaps`
+    are columns left out of every row of the band. `seat_type` is a name resolved among seat types of
+    the hall's theatre, so one layout can be applied to halls of any theatre. Seat score (used by best
+    available booking) is the band `score` (default 0) minus up to 1 for distance from the band centre.
+    """
+
+    @staticmethod
+    def _values(text):
+        values = []
+        for part in str(text).split(','):
+            start, _, end = part.strip().partition('-')
+            end = end or start
+            if start.isdigit() and end.isdigit():
+                start, end = int(start), int(end)
+                to_value = str
+            elif len(start) == 1 and len(end) == 1 and start.isalpha() and end.isalpha():
+                start, end = ord(start), ord(end)
+                to_value = chr
+            else:
+                raise InvalidLayout(f"'{part.strip()}' is neither a value nor a range.")
+            # Checked before the range is built, a huge range must not be expanded at all.
+            if len(values) + end - start + 1 > settings.HALL_LAYOUT_MAX_SEATS:
+                raise InvalidLayout(f"'{text}' has more than {settings.HALL_LAYOUT_MAX_SEATS} values.")
+            values += [to_value(value) for value in range(start, end + 1)]
+        if not values:
+            raise InvalidLayout(f"'{text}' is an empty range.")
+        return values
+
+    @staticmethod
+    def expand(spec):
+        """
+        Expands layout `spec` into a dict of (row, column) -> (seat type name, score).
+        Raises InvalidLayout if the spec is malformed, bands overlap or it has too many seats.
+        """
+        bands = spec.get('bands', None) if isinstance(spec, dict) else None
+        if not bands or not isinstance(bands, list):
+            raise InvalidLayout("Layout needs a non empty list of bands.")
+
+        seats = {}
+        for index, band in enumerate(bands):
+            if not isinstance(band, dict) or not all(band.get(key) for key in ['rows', 'columns', 'seat_type']):
+                raise InvalidLayout(f"Band {index} needs rows, columns and seat_type.")
+            try:
+                score = float(band.get('score', 0))
+                gaps = {str(int(gap)) for gap in band.get('gaps', [])}
+            except (TypeError, ValueError):
+                raise InvalidLayout(f"Band {index} has a non numeric score or gap.")
+            rows = HallLayoutServices._values(band['rows'])
+            columns = [column for column in HallLayoutServices._values(band['columns']) if column not in gaps]
+            numbers = [int(column) for column in columns if column.isdigit()]
+            centre = (min(numbers) + max(numbers)) / 2 if numbers else 0
+            half_width = max((max(numbers) - min(numbers)) / 2, 1) if numbers else 1
+
+            for row in rows:
+                for column in columns:
+                    if (row, column) in seats:
+                        raise InvalidLayout(f"Seat {row}{column} is in more than one band.")
+                    penalty = abs(int(column) - centre) / half_width if column.isdigit() else 0
+                    seats[(row, column)] = (band['seat_type'], round(score - penalty, 3))
+            if len(seats) > settings.HALL_LAYOUT_MAX_SEATS:
+                raise InvalidLayout(f"Layout has more than {settings.HALL_LAYOUT_MAX_SEATS} seats.")
+        return seats
+
+    @staticmethod
+    def hall_seats(hall_id):
+        """Seats of a hall in the same (row, column) -> (seat type name, score) form as `expand`."""
+        return {
+            (row, column): (seat_type, score)
+            for row, column, seat_type, score in
+            Seat.objects.filter(hall_id=hall_id).values_list('row', 'column', 'seat_type__name', 'score')
+        }
+
+    @staticmethod
+    def apply(seats, hall_ids):
+        """
+        Creates `seats` (as returned by `expand` or `hall_seats`) in every hall of `hall_ids` with one
+        bulk insert. Halls are locked while checked, they must exist and must not have seats yet.
+        Returns number of seats created per hall.
+        """
+        hall_ids = list(dict.fromkeys(hall_ids))
+        with transaction.atomic():
+            halls = {hall.id: hall for hall in Hall.objects.select_for_update().filter(id__in=hall_ids)}
+            missing = [hall_id for hall_id in hall_ids if hall_id not in halls]
+            if missing:
+                raise InvalidLayout(f"Halls with ID's: {missing} do not exist.")
+            seated = sorted(set(Seat.objects.filter(hall_id__in=hall_ids).values_list('hall_id', flat=True)))
+            if seated:
+                raise InvalidLayout(f"Halls with ID's: {seated} already have seats.")
+
+            names = {seat_type for seat_type, _ in seats.values()}
+            seat_types = {
+                (theatre_id, name): seat_type_id for seat_type_id, theatre_id, name in
+                SeatType.objects.filter(theatre_id__in={hall.theatre_id for hall in halls.values()}, name__in=names)
+                .values_list('id', 'theatre_id', 'name')
+            }
+            unknown = sorted({(hall.theatre_id, name) for hall in halls.values() for name in names} - set(seat_types))
+            if unknown:
+                raise InvalidLayout(f"Theatres are missing seat types (theatre ID, name): {unknown}")
+
+            Seat.objects.bulk_create([
+                Seat(row=row, column=column, score=score, hall_id=hall_id,
+                     seat_type_id=seat_types[(halls[hall_id].theatre_id, seat_type)])
+                for hall_id in hall_ids
+                for (row, column), (seat_type, score) in seats.items()
+            ], batch_size=5000)
+            transaction.on_commit(lambda: bump_generations([Seat]))
+
+        logger.info(f"Created {len(seats)} seats in each of halls with ID: {hall_ids}")
+        return {hall_id: len(seats) for hall_id in hall_ids}
+
+    @staticmethod
+    def diff(seats, other_seats):
+        """
+        Differences between two seat plans (as returned by `expand` or `hall_seats`): seats only in
+        `other_seats` are added, seats only in `seats` are removed, seats in both with another seat
+        type or score are changed.
+        """
+        def seat(key, value):
+            return {'row': key[0], 'column': key[1], 'seat_type': value[0], 'score': value[1]}
+
+        def order(key):
+            return key[0], column_key(key[1])
+
+        return {
+            'added': [seat(key, other_seats[key]) for key in sorted(other_seats.keys() - seats.keys(), key=order)],
+            'removed': [seat(key, seats[key]) for key in sorted(seats.keys() - other_seats.keys(), key=order)],
+            'changed': [
+                {**seat(key, other_seats[key]), 'from_seat_type': seats[key][0], 'from_score': seats[key][1]}
+                for key in sorted(seats.keys() & other_seats.keys(), key=order) if seats[key] != other_seats[key]
+            ],
+        }
+
+
+class ShowServices:
+
+    @staticmethod
+    def schedule_shows(movie, hall, start_date, end_date, start_times, base_price):
+        """
+        Creates a show of `movie` in `hall` for every start time of every day from `start_date`
+        to `end_date` (both inclusive) in one batch and starts ticket generation for all of them.
+        Returns created shows and ID of ticket generation job.
+        """
+        shows = []
+        day = start_date
+        while day <= end_date:
+            for start_time in start_times:
+                start_time = timezone.make_aware(datetime.combine(day, start_time))
+                shows.append(Show(
+                    movie=movie,
+                    hall=hall,
+                    base_price=base_price,
+                    start_time=start_time,
+                    time_range=Show.get_time_range(start_time, movie.length),
+                ))
+            day += timedelta(days=1)
+
+        conflicts = ShowServices.find_conflicts(hall.id, [show.time_range for show in shows])
+        if conflicts:
+            raise ShowConflict(conflicts)
+
+        with transaction.atomic():
+            Show.objects.bulk_create(shows)
+            job_id = ShowServices.generate_tickets([show.id for show in shows])
+            transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.MOVIE, [movie.id]))
+            # bulk_create sends no post_save, so cached show responses are invalidated here.
+            transaction.on_commit(lambda: bump_generations([Show]))
+
+        logger.info(f"Scheduled {len(shows)} shows of movie: {movie.id} in hall: {hall.id}, tickets job: {job_id}")
+        return shows, job_id
+
+    @staticmethod
+    def find_conflicts(hall_id, time_ranges, exclude_show_ids=()):
+        """
+        Finds overlaps of `time_ranges` with each other and with existing shows of hall `hall_id`.
+
+        Existing shows are fetched with one query over the GiST indexed time range, then both lists
+        are swept together in start order, so thousands of ranges are checked in O(n log n).
+        Returns list of conflicts, each a dict with the new time range and the show (or other new
+        time range) it overlaps with. Shows in `exclude_show_ids` (the ones being moved) are ignored.
+        """
+        if not time_ranges:
+            return []
+
+        existing = Show.objects.filter(
+            hall_id=hall_id,
+            time_range__overlap=DateTimeTZRange(
+                min(time_range.lower for time_range in time_ranges),
+                max(time_range.upper for time_range in time_ranges),
+            )
+        )
+        if exclude_show_ids:
+            existing = existing.exclude(id__in=exclude_show_ids)
+
+        intervals = [(time_range.lower, time_range.upper, None, time_range) for time_range in time_ranges]
+        intervals += [(time_range.lower, time_range.upper, show_id, time_range)
+                      for show_id, time_range in existing.values_list('id', 'time_range')]
+        intervals.sort(key=lambda interval: (interval[0], interval[1]))
+
+        conflicts = []
+        # Heap of (end, index) of intervals which have started and not yet ended.
+        active = []
+        for index, (start, end, show_id, time_range) in enumerate(intervals):
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, other_index in active:
+                other_show_id, other_time_range = intervals[other_index][2:]
+                if show_id is None:
+                    conflicts.append(ShowServices._conflict(time_range, other_show_id, other_time_range))
+                elif other_show_id is None:
+                    conflicts.append(ShowServices._conflict(other_time_range, show_id, time_range))
+            heapq.heappush(active, (end, index))
+        return conflicts
+
+    @staticmethod
+    def sync_time_ranges(movie_ids):
+        """
+        Recomputes time ranges of all shows of `movie_ids` from their current movie length with one
+        UPDATE ... FROM, touching only shows whose range changed. Must run in the transaction which
+        changed the lengths: the exclusion constraint re-validates the updated rows, so a lengthened
+        movie overlapping other shows of a hall raises IntegrityError and rolls the change back.
+        Returns ID's of the updated shows.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Show._meta.db_table} sh
+                SET time_range = tstzrange(sh.start_time, sh.start_time + m.length * interval '1 minute'),
+                    modified = now()
+                FROM {Movie._meta.db_table} m
+                WHERE m.id = sh.movie_id AND m.id = ANY(%s)
+                AND sh.time_range IS DISTINCT FROM
+                    tstzrange(sh.start_time, sh.start_time + m.length * interval '1 minute')
+                RETURNING sh.id
+                """,
+                [list(movie_ids)]
+            )
+            show_ids = [show_id for show_id, in cursor.fetchall()]
+        if show_ids:
+            # Set based update sends no post_save, so cached show responses are invalidated here.
+            transaction.on_commit(lambda: bump_generations([Show]))
+        return show_ids
+
+    @staticmethod
+    def _conflict(time_range, show_id, other_time_range):
+        return {
+            'start_time': time_range.lower,
+            'end_time': time_range.upper,
+            'conflicting_show': show_id,
+            'conflicting_start_time': other_time_range.lower,
+            'conflicting_end_time': other_time_range.upper,
+        }
+
+    @staticmethod
+    def adjust_seat_counts(show_ids, available=0, held=0, sold=0):
+        """
+        Moves seats between available, held and sold counters of shows, once per occurrence of a show
+        in `show_ids`. Runs in the caller's transaction, so counters change together with the tickets.
+
+        Shows are updated in ID order so concurrent multi show bookings lock them in the same order.
+        Counters are part of show responses, so `modified` is touched with them and ETag / Last-Modified
+        of the shows change. Cached show lists are not invalidated for them, they catch up within
+        RESPONSE_CACHE_TTL. Seat maps are the authoritative availability.
+        """
+        counts = {}
+        for show_id in show_ids:
+            counts[show_id] = counts.get(show_id, 0) + 1
+        now = timezone.now()
+        for show_id, count in sorted(counts.items()):
+            Show.all_objects.filter(id=show_id).update(
+                seats_available=F('seats_available') + available * count,
+                seats_held=F('seats_held') + held * count,
+                seats_sold=F('seats_sold') + sold * count,
+                modified=now,
+            )
+
+    @staticmethod
+    def reconcile_seat_counts(show_ids=None):
+        """
+        Recomputes seat counters of given shows (all shows if None) from their tickets in one
+        UPDATE ... FROM aggregate, touching only shows whose counters drifted, together with their
+        `modified` (see adjust_seat_counts). Shows without tickets are reconciled too, to zero.
+        Returns ID's of the repaired shows.
+        """
+        show_filter = "WHERE sh.id = ANY(%s)" if show_ids is not None else ""
+        params = [list(show_ids)] if show_ids is not None else []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Show._meta.db_table} s
+                SET seats_available = counts.available, seats_held = counts.held, seats_sold = counts.sold,
+                    modified = now()
+                FROM (
+                    SELECT
+                        sh.id AS show_id,
+                        count(t.id) FILTER (WHERE t.booking_id IS NULL) AS available,
+                        count(t.id) FILTER (WHERE t.booking_id IS NOT NULL AND NOT b.paid) AS held,
+                        count(t.id) FILTER (WHERE b.paid) AS sold
+                    FROM {Show._meta.db_table} sh
+                    LEFT JOIN {Ticket._meta.db_table} t ON t.show_id = sh.id AND NOT t.is_deleted
+                    LEFT JOIN {Booking._meta.db_table} b ON b.id = t.booking_id
+                    {show_filter}
+                    GROUP BY sh.id
+                ) counts
+                WHERE s.id = counts.show_id
+                AND (s.seats_available, s.seats_held, s.seats_sold)
+                    IS DISTINCT FROM (counts.available, counts.held, counts.sold)
+                RETURNING s.id
+                """,
+                params
+            )
+            return [show_id for show_id, in cursor.fetchall()]
+
+    @staticmethod
+    @shared_task(name="reconcile_show_seat_counts", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def reconcile_all_seat_counts():
+        repaired = ShowServices.reconcile_seat_counts()
+        if repaired:
+            logger.warning(f"Repaired drifted seat counters of shows with ID: {repaired}")
+        return len(repaired)
+
+    @staticmethod
+    def generate_tickets(show_ids):
+        """
+        Splits ticket generation of `show_ids` in chunks of SHOW_SCHEDULE_CHUNK_SIZE shows spread over
+        the worker pool as one celery group. Group is sent once the current transaction commits.
+        Returns ID of the group which can be passed to `job_progress`.
+        """
+        chunk_size = settings.SHOW_SCHEDULE_CHUNK_SIZE
+        job = group(
+            TicketServices.create_tickets_for_shows_task.s(show_ids[i:i + chunk_size])
+            for i in range(0, len(show_ids), chunk_size)
+        )
+        job_id = celery_uuid()
+
+        def start():
+            job.apply_async(task_id=job_id).save()
+
+        transaction.on_commit(start)
+        return job_id
+
+    @staticmethod
+    def job_progress(job_id):
+        result = GroupResult.restore(job_id)
+        if result is None:
+            return None
+        return {
+            'id': job_id,
+            'total': len(result.results),
+            'completed': result.completed_count(),
+            'failed': result.failed(),
+            'ready': result.ready(),
+        }
+
+
+class ShowListingServices:
+    """
+    Maintains ShowListing rows, the read model of upcoming shows per city, date and movie.
+    """
+
+    @staticmethod
+    def refresh(show_ids):
+        """
+        Rebuilds listings of given shows from one query, removing listings of deleted or past shows.
+        """
+        show_ids = list(show_ids)
+        shows = (
+            Show.objects.filter(id__in=show_ids, start_time__gte=timezone.now())
+            .select_related('movie', 'hall__theatre')
+        )
+        listings = [
+            ShowListing(
+                show=show,
+                city=show.hall.theatre.city,
+                date=timezone.localtime(show.start_time).date(),
+                start_time=show.start_time,
+                movie=show.movie,
+                movie_name=show.movie.name,
+                movie_genre=show.movie.genre,
+                movie_certificate=show.movie.certificate,
+                movie_length=show.movie.length,
+                theatre=show.hall.theatre,
+                theatre_name=show.hall.theatre.name,
+                hall=show.hall,
+                hall_name=show.hall.name,
+            )
+            for show in shows
+        ]
+        with transaction.atomic():
+            ShowListing.objects.filter(show_id__in=show_ids).delete()
+            ShowListing.objects.bulk_create(listings)
+        return len(listings)
+
+    @staticmethod
+    @shared_task(name="refresh_show_listings_of", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def refresh_of(movie_id=None, theatre_id=None, hall_id=None):
+        """
+        Refreshes listings of upcoming shows of a movie, theatre or hall, after one of them changed.
+        """
+        shows = Show.objects.filter(start_time__gte=timezone.now())
+        if movie_id is not None:
+            shows = shows.filter(movie_id=movie_id)
+        if theatre_id is not None:
+            shows = shows.filter(hall__theatre_id=theatre_id)
+        if hall_id is not None:
+            shows = shows.filter(hall_id=hall_id)
+        # Listings of shows which got deleted are removed as well.
+        listings = ShowListing.objects.filter(
+            **{key: value for key, value in
+               [('movie_id', movie_id), ('theatre_id', theatre_id), ('hall_id', hall_id)] if value is not None}
+        )
+        show_ids = set(shows.values_list('id', flat=True)) | set(listings.values_list('show_id', flat=True))
+        return ShowListingServices.refresh(show_ids)
+
+    @staticmethod
+    @shared_task(name="refresh_show_listings", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def refresh_all():
+        """
+        Reconciles listings of all upcoming shows and drops listings of past shows.
+        """
+        ShowListing.objects.filter(start_time__lt=timezone.now()).delete()
+        show_ids = list(Show.objects.filter(start_time__gte=timezone.now()).values_list('id', flat=True))
+        stale_ids = list(ShowListing.objects.exclude(show_id__in=show_ids).values_list('show_id', flat=True))
+        refreshed = 0
+        for i in range(0, len(show_ids), 1000):
+            refreshed += ShowListingServices.refresh(show_ids[i:i + 1000])
+        ShowListing.objects.filter(show_id__in=stale_ids).delete()
+        logger.info(f"Refreshed {refreshed} show listings")
+        return refreshed
+
+
+class PricingServices:
+    """
+    Dynamic pricing of upcoming shows from occupancy and time to showtime.
+
+    Price factor of a show is the factor of the highest occupancy tier it reached times the factor of
+    the nearest lead time tier it is within (DYNAMIC_PRICING_* settings), clipped to the allowed range.
+    Shows are priced a chunk at a time: factors are computed as vectors and written in bulk, then
+    unsold tickets are repriced from them in SQL. Quotes are read from the seat type x show price
+    matrix, the outer product of seat type multipliers and factored base prices, in which every
+    unsold ticket takes its cell. Both round prices the same way (TICKET_PRICE_SQL).
+    """
+
+    @staticmethod
+    def factors(occupancy, hours):
+        """Price factors of shows with given occupancy ratios and hours to showtime (numpy arrays)."""
+        occupancy_tiers = sorted(settings.DYNAMIC_PRICING_OCCUPANCY_TIERS)
+        lead_time_tiers = sorted(settings.DYNAMIC_PRICING_LEAD_TIME_TIERS)
+
+        occupancy_factors = np.array([1.0] + [factor for _, factor in occupancy_tiers])
+        occupancy_limits = np.array([limit for limit, _ in occupancy_tiers], dtype=float)
+        lead_time_factors = np.array([factor for _, factor in lead_time_tiers] + [1.0])
+        lead_time_limits = np.array([limit for limit, _ in lead_time_tiers], dtype=float)
+
+        factors = (
+            occupancy_factors[np.searchsorted(occupancy_limits, occupancy, side='right')]
+            * lead_time_factors[np.searchsorted(lead_time_limits, hours, side='left')]
+        )
+        return np.clip(factors, settings.DYNAMIC_PRICING_MIN_FACTOR, settings.DYNAMIC_PRICING_MAX_FACTOR)
+
+    @staticmethod
+    def _shows(show_ids, now, lock=False):
+        """(id, base price, price factor, start time, *seat counters) of upcoming shows of `show_ids` by ID."""
+        shows = Show.objects.filter(id__in=show_ids, start_time__gt=now).order_by('id')
+        if lock:
+            shows = shows.select_for_update()
+        return list(shows.values_list('id', 'base_price', 'price_factor', 'start_time', *Show.seat_counter_fields))
+
+    @staticmethod
+    def _tickets(show_ids):
+        """(id, show id, seat type id, seat type multiplier, price) of unsold tickets of `show_ids`."""
+        return list(
+            Ticket.objects.filter(show_id__in=show_ids, booking__isnull=True)
+            .values_list('id', 'show_id', 'seat__seat_type_id', 'seat__seat_type__price_multiplier', 'price')
+        )
+
+    @staticmethod
+    def _price(show_ids, lock=False):
+        """
+        Prices unsold tickets of upcoming shows of `show_ids` without writing anything, locking
+        the shows (in ID order, like seat counter updates) if `lock` is set.
+        Returns None if none of the shows is upcoming.
+        """
+        now = timezone.now()
+        shows = PricingServices._shows(show_ids, now, lock)
+        if not shows:
+            return None
+        ids, base_prices, current_factors, start_times, available, held, sold = zip(*shows)
+        ids = np.array(ids)
+        booked = np.array(held) + np.array(sold)
+        total = booked + np.array(available)
+        occupancy = np.divide(booked, total, out=np.zeros(len(ids)), where=total > 0)
+        hours = np.array([(start_time - now).total_seconds() for start_time in start_times]) / 3600
+        factors = PricingServices.factors(occupancy, hours)
+
+        tickets = PricingServices._tickets(ids.tolist())
+        ticket_ids, ticket_show_ids, seat_type_ids, multipliers, prices = (
+            np.array(column) for column in (zip(*tickets) if tickets else [[]] * 5)
+        )
+        seat_type_ids, first, seat_type_index = np.unique(seat_type_ids, return_index=True, return_inverse=True)
+        show_index = np.searchsorted(ids, ticket_show_ids)
+
+        matrix = round_prices(np.outer(multipliers[first], np.array(base_prices) * factors))
+        new_prices = matrix[seat_type_index, show_index]
+        # Tickets priced before prices were rounded to cents are only counted if off by a cent or more.
+        changed = np.abs(new_prices - prices.astype(float)) >= 0.005
+
+        return {
+            'shows': ids,
+            'occupancy': occupancy,
+            'hours': hours,
+            'current_factors': np.array(current_factors),
+            'factors': factors,
+            'seat_types': seat_type_ids,
+            'matrix': matrix,
+            'tickets': ticket_ids,
+            'show_index': show_index,
+            'seat_type_index': seat_type_index,
+            'prices': new_prices,
+            'changed': changed,
+        }
+
+    @staticmethod
+    def quote(show_ids):
+        """
+        Dry run of `price_shows`: factors and seat type prices the next pricing run would give upcoming
+        shows of `show_ids`, with the number of unsold tickets it would reprice.
+        """
+        priced = PricingServices._price(show_ids)
+        if priced is None:
+            return []
+        count = len(priced['shows'])
+        tickets = np.bincount(priced['show_index'], minlength=count)
+        repriced = np.bincount(priced['show_index'][priced['changed']], minlength=count)
+        has_seat_type = np.zeros(priced['matrix'].shape, dtype=bool)
+        has_seat_type[priced['seat_type_index'], priced['show_index']] = True
+
+        return [
+            {
+                'show': int(show_id),
+                'occupancy': round(float(priced['occupancy'][i]), 3),
+                'hours_to_start': round(float(priced['hours'][i]), 1),
+                'price_factor': float(priced['current_factors'][i]),
+                'quoted_price_factor': round(float(priced['factors'][i]), 4),
+                'prices': {
+                    int(seat_type_id): float(priced['matrix'][j, i])
+                    for j, seat_type_id in enumerate(priced['seat_types']) if has_seat_type[j, i]
+                },
+                'tickets': int(tickets[i]),
+                'repriced_tickets': int(repriced[i]),
+            }
+            for i, show_id in enumerate(priced['shows'])
+        ]
+
+    @staticmethod
+    def price_shows(show_ids):
+        """
+        Sets price factors of upcoming shows of `show_ids` with one UPDATE ... FROM unnest of the
+        changed rows, then reprices their unsold tickets with `TicketServices.reprice_tickets`.
+        Shows are locked while priced, so base prices changed meanwhile are not overwritten.
+        Returns number of repriced tickets.
+        """
+        with transaction.atomic():
+            priced = PricingServices._price(show_ids, lock=True)
+            if priced is None:
+                return 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {Show._meta.db_table} s SET price_factor = v.factor, modified = now()"
+                    f" FROM unnest(%s::integer[], %s::double precision[]) AS v(id, factor)"
+                    f" WHERE s.id = v.id AND s.price_factor IS DISTINCT FROM v.factor",
+                    [priced['shows'].tolist(), priced['factors'].tolist()]
+                )
+                if cursor.rowcount:
+                    transaction.on_commit(lambda: bump_generations([Show]))
+            return TicketServices.reprice_tickets(show_ids=priced['shows'].tolist())
+
+    @staticmethod
+    @shared_task(name="price_upcoming_shows", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def price_upcoming_shows():
+        show_ids = list(Show.objects.filter(start_time__gt=timezone.now()).order_by('id').values_list('id', flat=True))
+        chunk_size = settings.DYNAMIC_PRICING_CHUNK_SIZE
+        repriced = sum(
+            PricingServices.price_shows(show_ids[i:i + chunk_size]) for i in range(0, len(show_ids), chunk_size)
+        )
+        logger.info(f"Repriced {repriced} tickets of {len(show_ids)} upcoming shows")
+        return repriced
+
+
 class BookingServices:
 
+    @staticmethod
+    def create_booking(serializer, hold_token=None):
+        """
+        Saves booking from a validated BookingSerializer and claims its tickets.
+
+        Tickets held by someone else are treated as unavailable. If `hold_token` is passed, the
+        hold is released once the booking is committed.
+        """
+        with transaction.atomic():
+            booking = serializer.save()
+            claimed = TicketServices.claim_tickets(booking.ticket_ids, booking.id)
+            BookingServices._complete_booking(booking, claimed, hold_token)
+        return booking
+
+    @staticmethod
+    def _complete_booking(booking, claimed, hold_token=None):
+        """
+        Prices a booking from its claimed tickets and moves them to held seats of their shows, or to
+        sold ones if the booking was created paid. Tickets held by someone else are treated as unavailable.
+        """
+        held_ticket_ids = SeatHoldServices.held_by_others(
+            [(ticket_id, show_id) for ticket_id, _, show_id in claimed], hold_token
+        )
+        if held_ticket_ids:
+            raise TicketsUnavailable(held_ticket_ids)
+        booking.price = sum(price for _, price, _ in claimed)
+        booking.save(update_fields=['price', 'modified'])
+        show_ids = [show_id for _, _, show_id in claimed]
+        if booking.paid:
+            ShowServices.adjust_seat_counts(show_ids, available=-1, sold=1)
+        else:
+            ShowServices.adjust_seat_counts(show_ids, available=-1, held=1)
+
+        transaction.on_commit(
+            lambda: SeatMapServices.mark_tickets([(ticket_id, show_id) for ticket_id, _, show_id in claimed], sold=True)
+        )
+        if hold_token:
+            transaction.on_commit(lambda: SeatHoldServices.release(hold_token))
+
+    @staticmethod
+    def best_blocks(tickets, count, limit):
+        """
+        Returns up to `limit` blocks of `count` adjacent free seats in one row, best total score first.
+
+        `tickets` is an iterable of (ticket_id, row, column, score, free) tuples covering every seat
+        of the show, so booked seats break blocks. Numeric columns must also be consecutive numbers,
+        gaps in numbering (aisles) break blocks too.
+        """
+        rows = {}
+        for ticket in tickets:
+            rows.setdefault(ticket[1], []).append(ticket)
+
+        blocks = []
+        for row, seats in rows.items():
+            seats.sort(key=lambda seat: column_key(seat[2]))
+            start = 0
+            for i, (_, _, column, _, free) in enumerate(seats):
+                previous = seats[i - 1][2] if i > start else None
+                if not free:
+                    start = i + 1
+                    continue
+                if previous is not None and previous.isdigit() and column.isdigit() \
+                        and int(column) - int(previous) != 1:
+                    start = i
+                if i - start + 1 >= count:
+                    block = seats[i - count + 1:i + 1]
+                    blocks.append((-sum(seat[3] for seat in block), row, i, [seat[0] for seat in block]))
+        return [block[-1] for block in heapq.nsmallest(limit, blocks)]
+
+    @staticmethod
+    def book_best_available(show_id, count, seat_type_id=None, hold_token=None):
+        """
+        Books `count` best scoring adjacent free seats in one row of a show.
+
+        Candidate blocks are locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent allocators
+        skip blocks someone else is claiming instead of waiting on them, and the first block locked
+        whole is claimed. Raises TicketsUnavailable if no block could be found.
+        """
+        show = Show.objects.get(id=show_id)
+        if show.seats_available < count:
+            raise TicketsUnavailable([])
+
+        # Seats of other types stay in the rows as taken, so they break blocks like booked seats do.
+        tickets = list(Ticket.objects.filter(show_id=show_id).values_list(
+            'id', 'seat__row', 'seat__column', 'seat__score', 'seat__seat_type_id', 'booking_id'
+        ))
+        held_ticket_ids = set(SeatHoldServices.held_by_others(
+            [(ticket_id, show_id) for ticket_id, *_ in tickets], hold_token
+        ))
+        blocks = BookingServices.best_blocks(
+            [(ticket_id, row, column, score,
+              booking_id is None and ticket_id not in held_ticket_ids
+              and (seat_type_id is None or seat_type == seat_type_id))
+             for ticket_id, row, column, score, seat_type, booking_id in tickets],
+            count, settings.BEST_AVAILABLE_CANDIDATES,
+        )
+
+        with transaction.atomic():
+            for ticket_ids in blocks:
+                savepoint = transaction.savepoint()
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT id FROM {Ticket._meta.db_table}"
+                        f" WHERE id = ANY(%s) AND booking_id IS NULL AND is_deleted = false"
+                        f" FOR UPDATE SKIP LOCKED",
+                        [ticket_ids]
+                    )
+                    locked = cursor.fetchall()
+                if len(locked) < count:
+                    # Releases locks taken on the partially free block.
+                    transaction.savepoint_rollback(savepoint)
+                    continue
+                transaction.savepoint_commit(savepoint)
+
+                booking = Booking.objects.create(ticket_ids=[str(ticket_id) for ticket_id in ticket_ids])
+                claimed = TicketServices.claim_tickets(ticket_ids, booking.id)
+                BookingServices._complete_booking(booking, claimed, hold_token)
+                logger.info(f"Booked best available tickets with ID: {ticket_ids} of show ID: {show_id}")
+                return booking
+
+        raise TicketsUnavailable([])
+
+    @staticmethod
+    def release_bookings(booking_ids, unpaid_only=False):
+        """
+        Soft deletes given bookings and frees their tickets with one set based UPDATE per table.
+        Used both for unpaid bookings running out of time (`unpaid_only`) and for cancellations.
+
+        Bookings are locked first, bookings already released or (with `unpaid_only`) paid meanwhile
+        are skipped, so a booking is never released twice nor released while being paid.
+        Returns ID's of the released bookings.
+        """
+        with transaction.atomic():
+            bookings = Booking.objects.select_for_update().filter(id__in=booking_ids)
+            if unpaid_only:
+                bookings = bookings.filter(paid=False)
+            booking_ids = list(bookings.order_by('id').values_list('id', flat=True))
+            if not booking_ids:
+                return []
+
+            released = TicketServices.release_tickets(booking_ids)
+            Booking.objects.filter(id__in=booking_ids).update(is_deleted=True, modified=timezone.now())
+            ShowServices.adjust_seat_counts(
+                [show_id for _, show_id, paid in released if not paid], available=1, held=-1
+            )
+            ShowServices.adjust_seat_counts([show_id for _, show_id, paid in released if paid], available=1, sold=-1)
+            tickets = [(ticket_id, show_id) for ticket_id, show_id, _ in released]
+            transaction.on_commit(lambda: SeatMapServices.mark_tickets(tickets, sold=False))
+        return booking_ids
+
+    @staticmethod
+    def update_booking(serializer):
+        """
+        Saves a validated BookingSerializer of an existing booking, moving its tickets
+        between held and sold seat counters of their shows when payment status changes.
+
+        Booking is locked and re-read first, so concurrent payments and the expiry sweeper see each
+        other's changes. Raises Booking.DoesNotExist if the booking was released meanwhile.
+        """
+        with transaction.atomic():
+            serializer.instance = Booking.objects.select_for_update().get(pk=serializer.instance.pk)
+            was_paid = serializer.instance.paid
+            booking = serializer.save()
+            if booking.paid != was_paid:
+                show_ids = list(Ticket.objects.filter(booking_id=booking.id).values_list('show_id', flat=True))
+                if booking.paid:
+                    ShowServices.adjust_seat_counts(show_ids, held=-1, sold=1)
+                else:
+                    ShowServices.adjust_seat_counts(show_ids, held=1, sold=-1)
+        return booking
+
     @staticmethod
     @shared_task(name="delete_if_unpaid", time_limit=60 * 30, soft_time_limit=60 * 30)
     def delete_if_unpaid(booking_id=None):
         logger.info(f"Delete booking invoked for: {booking_id}")
-        bookings = Booking.objects.filter(id=booking_id)
+        cutoff = timezone.now() - timedelta(seconds=settings.BOOKING_HOLD_TTL)
+        booking_ids = list(
+            Booking.objects.filter(id=booking_id, paid=False, modified__lte=cutoff).values_list('id', flat=True)
+        )
+        # Payment status is checked again under the booking lock by release_bookings.
+        for booking_id in BookingServices.release_bookings(booking_ids, unpaid_only=True):
+            logger.info(f"Deleted Booking with ID: {booking_id} as it is unpaid"
+                        f" and create more than {settings.BOOKING_HOLD_TTL} seconds ago.")
+
+    @staticmethod
+    @shared_task(name="release_expired_bookings", time_limit=60 * 30, soft_time_limit=60 * 30)
+    def release_expired_bookings():
+        """
+        Releases all unpaid bookings older than BOOKING_HOLD_TTL seconds.
+
+        Works in chunks of BOOKING_SWEEP_CHUNK_SIZE bookings, each chunk in its own transaction.
+        Rows locked by a concurrent payment are skipped and picked up by the next run.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.BOOKING_HOLD_TTL)
+        released = 0
 
-        for booking in bookings:
-            booking_timedelta = (timezone.now() - booking.modified).seconds
-            if not booking.paid and booking_timedelta >= 100:
-                logger.info(f"Deleting Booking with ID: {booking.id} as it is unpaid"
-                            f" and create more than {100} seconds ago.")
-                booking.delete()
-                booking.tickets.update(booking=None)
+        while True:
+            with transaction.atomic():
+                booking_ids = list(
+                    Booking.objects.select_for_update(skip_locked=True)
+                    .filter(paid=False, modified__lt=cutoff)
+                    .order_by('modified')
+                    .values_list('id', flat=True)[:settings.BOOKING_SWEEP_CHUNK_SIZE]
+                )
+                if not booking_ids:
+                    break
+                released += len(BookingServices.release_bookings(booking_ids, unpaid_only=True))
 
+        logger.info(f"Released {released} unpaid bookings created before {cutoff}.")
+        return released
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from bmm.bookings.models import Hall, Movie, Show, Theatre
+from bmm.bookings.services import AutocompleteServices, ShowListingServices
+from bmm.utils.cache import bump_generations
+from bmm.utils.models import BaseModel
+
+
+def bump_cache_generation(sender, **kwargs):
+    # Cached responses are keyed by model generations, see CacheResponseMixin.
+    transaction.on_commit(lambda: bump_generations([sender]))
+
+
+def connect_cache_generation_receivers(app_config):
+    """
+    Connects bump_cache_generation to each BaseModel of `app_config` with an explicit sender. A receiver
+    without sender would make every model of the project lose fast deletes (see Collector.can_fast_delete).
+    """
+    for model in app_config.get_models():
+        if issubclass(model, BaseModel):
+            post_save.connect(bump_cache_generation, sender=model)
+            post_delete.connect(bump_cache_generation, sender=model)
+
+
+@receiver([post_save, post_delete], sender=Movie)
+def reindex_movie_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.MOVIE, [instance.id]))
+
+
+@receiver([post_save, post_delete], sender=Show)
+def reindex_show_movie_autocomplete(sender, instance, **kwargs):
+    # Cities a movie is suggested in follow the cities of its upcoming shows.
+    transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.MOVIE, [instance.movie_id]))
+
+
+@receiver([post_save, post_delete], sender=Theatre)
+def reindex_theatre_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: AutocompleteServices.reindex(AutocompleteServices.THEATRE, [instance.id]))
+
+
+@receiver([post_save, post_delete], sender=Show)
+def refresh_show_listing(sender, instance, **kwargs):
+    transaction.on_commit(lambda: ShowListingServices.refresh([instance.id]))
+
+
+@receiver(post_save, sender=Movie)
+def refresh_movie_show_listings(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: ShowListingServices.refresh_of.delay(movie_id=instance.id))
+
+
+@receiver(post_save, sender=Theatre)
+def refresh_theatre_show_listings(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: ShowListingServices.refresh_of.delay(theatre_id=instance.id))
+
+
+@receiver(post_save, sender=Hall)
+def refresh_hall_show_listings(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: ShowListingServices.refresh_of.delay(hall_id=instance.id))
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+from bmm.bookings.models import Hall, Movie, Seat, SeatType, Show, Theatre, Ticket
+
+
+@pytest.fixture
+def show(db):
+    """An upcoming show with five seats in row A, one ticket each priced 150."""
+    movie = Movie.objects.create(
+        name="Movie", length=120, cast=["Actor"], director="Director", certificate=Movie.CERTIFICATE_U
+    )
+    theatre = Theatre.objects.create(name="Theatre", city="Pune")
+    hall = Hall.objects.create(name="Hall", theatre=theatre)
+    seat_type = SeatType.objects.create(name="Gold", price_multiplier=1.5, theatre=theatre)
+    show = Show.objects.create(
+        start_time=timezone.make_aware(datetime(2030, 1, 1, 18)), base_price=100, movie=movie, hall=hall
+    )
+    for column in range(1, 6):
+        seat = Seat.objects.create(row="A", column=str(column), seat_type=seat_type, hall=hall)
+        Ticket.objects.create(price=150, show=show, seat=seat)
+    return show
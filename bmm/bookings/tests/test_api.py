@@ -0,0 +1,182 @@
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.db.models.deletion import Collector
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from bmm.bookings.api import MovieViewSet, SeatViewSet, ShowViewSet, TheatreViewSet, TicketViewSet
+from bmm.bookings.models import Hall, Movie, Seat, SeatType, Show, ShowListing, Theatre, Ticket
+from bmm.bookings.pagination import CreatedCursorPagination
+from bmm.utils.cache import bump_generations
+from bmm.utils.renderers import ORJSONRenderer, StdlibJSONRenderer
+
+
+def cache_key(viewset_class, query):
+    request = Request(APIRequestFactory().get(f"/api/shows/?{query}"))
+    request.accepted_renderer = ORJSONRenderer()
+    view = viewset_class(request=request, action='list', basename='show', format_kwarg=None, kwargs={})
+    return view.get_cache_key(request)
+
+
+def test_expanded_relations_invalidate_cached_responses():
+    expanded, plain = cache_key(ShowViewSet, "expand=movie"), cache_key(ShowViewSet, "")
+    bump_generations([Movie])
+    assert cache_key(ShowViewSet, "expand=movie") != expanded
+    assert cache_key(ShowViewSet, "") == plain
+
+    expanded = cache_key(ShowViewSet, "expand=movie")
+    bump_generations([Hall])
+    assert cache_key(ShowViewSet, "expand=movie") == expanded
+
+
+def test_cache_generations_follow_base_models_only():
+    assert post_save.has_listeners(Movie) and post_delete.has_listeners(Ticket)
+    # Models without receivers keep fast deletes, as ShowListing refreshes rely on.
+    assert not post_delete.has_listeners(ShowListing)
+    assert Collector(using='default').can_fast_delete(ShowListing.objects.all())
+
+@pytest.mark.parametrize("accept, query, renderer_class", [
+    ("application/json", "", ORJSONRenderer),
+    ("*/*", "", ORJSONRenderer),
+    ("application/vnd.bmm.stdlib+json", "", StdlibJSONRenderer),
+    ("*/*", "format=stdlib-json", StdlibJSONRenderer),
+])
+def test_json_renderer_negotiation(accept, query, renderer_class):
+    request = Request(APIRequestFactory().get(f"/api/shows/?{query}", HTTP_ACCEPT=accept))
+    view = ShowViewSet()
+    renderer, media_type = DefaultContentNegotiation().select_renderer(request, view.get_renderers())
+    assert isinstance(renderer, renderer_class)
+    assert renderer.render({"a": 1}, media_type) in (b'{"a":1}', b'{"a": 1}')
+
+def test_cached_list_answers_conditional_requests():
+    calls = []
+
+    def list_view(request):
+        calls.append(request)
+        response = Response({"results": []})
+        response['ETag'] = '"v1"'
+        return response
+
+    def cached(**headers):
+        request = Request(APIRequestFactory().get("/api/shows/?ordering=id", **headers))
+        request.accepted_renderer = ORJSONRenderer()
+        view = ShowViewSet(request=request, action='list', basename='show', format_kwarg=None, kwargs={})
+        return view.cached_response(request, list_view)
+
+    assert cached().status_code == 200
+    response = cached(HTTP_IF_NONE_MATCH='"v1"')
+    assert (response.status_code, response['ETag']) == (304, '"v1"')
+    assert cached()['ETag'] == '"v1"'
+    assert len(calls) == 1
+
+
+@pytest.mark.django_db
+def test_changing_seat_type_reprices_its_tickets(show):
+    ticket = Ticket.objects.filter(show=show).select_related('seat').first()
+    silver = SeatType.objects.create(name="Silver", price_multiplier=2.0, theatre=show.hall.theatre)
+    request = APIRequestFactory().patch(f"/api/seats/{ticket.seat_id}/", {"seat_type": silver.id}, format='json')
+    response = SeatViewSet.as_view({'patch': 'partial_update'})(request, id=str(ticket.seat_id))
+    assert response.status_code == 200
+    ticket.refresh_from_db()
+    assert ticket.price == 200.0
+    assert set(Ticket.objects.filter(show=show).exclude(id=ticket.id).values_list('price', flat=True)) == {150.0}
+
+
+@pytest.mark.django_db
+def test_seatmap_of_unknown_show_is_not_found(show):
+    def seatmap(show_id):
+        request = APIRequestFactory().get(f"/api/shows/{show_id}/seatmap/")
+        return ShowViewSet.as_view({'get': 'seatmap'})(request, id=str(show_id))
+
+    assert seatmap(show.id + 1).status_code == 404
+    assert seatmap(show.id).data['size'] == 5
+
+
+@pytest.mark.django_db
+def test_duplicate_tickets_conflict(show):
+    ticket = Ticket.objects.filter(show=show).first()
+    data = {"price": 100, "show": show.id, "seat": ticket.seat_id}
+    create = TicketViewSet.as_view({'post': 'create'})
+    assert create(APIRequestFactory().post("/api/tickets/", data, format='json')).status_code == 409
+    assert create(APIRequestFactory().post("/api/tickets/", [data], format='json')).status_code == 409
+
+
+@pytest.mark.django_db
+def test_single_ticket_writes_keep_seat_counters(show):
+    seat = Seat.objects.create(row="B", column="1", seat_type=SeatType.objects.get(), hall=show.hall)
+    create = TicketViewSet.as_view({'post': 'create'})
+    response = create(APIRequestFactory().post("/api/tickets/", {"price": 150, "show": show.id, "seat": seat.id},
+                                               format='json'))
+    assert response.status_code == 201
+    show.refresh_from_db()
+    assert show.seats_available == 6
+
+    destroy = TicketViewSet.as_view({'delete': 'destroy'})
+    ticket_id = response.data['id']
+    assert destroy(APIRequestFactory().delete(f"/api/tickets/{ticket_id}/"), id=str(ticket_id)).status_code == 204
+    show.refresh_from_db()
+    assert show.seats_available == 5
+
+@pytest.mark.django_db
+def test_movie_length_moves_show_time_ranges(show):
+    movie = Movie.objects.create(
+        name="Other", length=90, cast=["Actor"], director="Director", certificate=Movie.CERTIFICATE_U
+    )
+    later = Show.objects.create(
+        start_time=show.start_time + timedelta(minutes=150), base_price=100, movie=movie, hall=show.hall
+    )
+
+    def update(length):
+        request = APIRequestFactory().patch(f"/api/movies/{show.movie_id}/", {"length": length}, format='json')
+        return MovieViewSet.as_view({'patch': 'partial_update'})(request, id=str(show.movie_id))
+
+    assert update(180).status_code == 409
+    show.refresh_from_db()
+    assert show.time_range.upper == show.start_time + timedelta(minutes=120)
+
+    assert update(140).status_code == 200
+    show.refresh_from_db()
+    assert show.time_range.upper == show.start_time + timedelta(minutes=140)
+    later.refresh_from_db()
+    assert later.time_range.upper == later.start_time + timedelta(minutes=90)
+
+def test_cursor_pages_by_row_comparison():
+    paginator = CreatedCursorPagination()
+    paginator.model = Ticket
+    queryset = paginator.filter_after(Ticket.objects.all(), ('-created', '-id'), ['2030-01-01 18:00:00+00:00', '7'])
+    assert '("bookings_ticket"."created", "bookings_ticket"."id") < (' in str(queryset.query)
+
+    queryset = paginator.filter_after(Ticket.objects.all(), ('-price', 'id'), ['150.0', '7'])
+    assert '"bookings_ticket"."price" < 150.0 OR ("bookings_ticket"."price" = 150.0 AND "bookings_ticket"."id" > 7)' \
+        in str(queryset.query)
+
+
+@pytest.mark.django_db
+def test_cursor_pages_past_rows_sharing_created(settings):
+    settings.RESPONSE_CACHE_TTL = 0
+    Theatre.objects.bulk_create(Theatre(name=f"Theatre {number}", city="Pune") for number in range(1100))
+    Theatre.objects.update(created=timezone.now())
+
+    def page(cursor=None):
+        params = {"page_size": 100} if cursor is None else {"page_size": 100, "cursor": cursor}
+        response = TheatreViewSet.as_view({'get': 'list'})(APIRequestFactory().get("/api/theatres", params))
+        return response.data
+
+    def cursor(link):
+        return parse_qs(urlparse(link).query)['cursor'][0] if link else None
+
+    ids, data = [], page()
+    while True:
+        ids += [theatre['id'] for theatre in data['results']]
+        if not data['next']:
+            break
+        previous, data = data, page(cursor(data['next']))
+    assert ids == sorted(Theatre.objects.values_list('id', flat=True), reverse=True)
+    assert [theatre['id'] for theatre in page(cursor(data['previous']))['results']] == \
+        [theatre['id'] for theatre in previous['results']]
@@ -0,0 +1,142 @@
+from datetime import timedelta
+import uuid
+
+import pytest
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from bmm.bookings.api import ShowViewSet, TicketViewSet
+from bmm.bookings.models import Seat, SeatType, Show, Ticket
+from bmm.bookings.serializers import (
+    BookingSerializer,
+    HallLayoutSerializer,
+    MovieSerializer,
+    ShowSerializer,
+    ShowValuesSerializer,
+    TicketRepriceSerializer,
+    TicketSerializer,
+    TicketValuesSerializer,
+)
+
+
+def as_row(instance, columns):
+    return {column: getattr(instance, column) for column in columns}
+
+
+def assert_parity(serializer_class, values_serializer_class, instances):
+    columns = values_serializer_class.columns()
+    expected = serializer_class(instances, many=True).data
+    actual = values_serializer_class.serialize([as_row(instance, columns) for instance in instances])
+    assert actual == expected
+    assert [list(item) for item in actual] == [list(item) for item in expected]
+
+
+def test_ticket_values_serializer_parity():
+    now = timezone.now().replace(microsecond=123456)
+    tickets = [
+        Ticket(id=1, uuid=uuid.uuid4(), created=now, modified=now, price=150.0, show_id=3, seat_id=7, booking_id=None),
+        Ticket(id=2, uuid=uuid.uuid4(), created=now, modified=now + timedelta(seconds=1), price=99.5,
+               show_id=3, seat_id=8, booking_id=11),
+    ]
+    assert_parity(TicketSerializer, TicketValuesSerializer, tickets)
+
+
+@pytest.mark.parametrize("available, held, sold", [(10, 0, 0), (0, 2, 8), (0, 0, 0), (3, 4, 5)])
+def test_show_values_serializer_parity(available, held, sold):
+    now = timezone.now()
+    show = Show(
+        id=5, uuid=uuid.uuid4(), created=now, modified=now, start_time=now + timedelta(days=1),
+        base_price=120.0, movie_id=2, hall_id=4,
+        seats_available=available, seats_held=held, seats_sold=sold,
+    )
+    assert_parity(ShowSerializer, ShowValuesSerializer, [show])
+
+
+def request_with(method="get", **params):
+    query = "&".join(f"{name}={value}" for name, value in params.items())
+    return Request(getattr(APIRequestFactory(), method)(f"/bookings/?{query}"))
+
+
+def test_sparse_fieldset_and_expansion():
+    serializer = ShowSerializer(context={"request": request_with(fields="id,base_price,nope", expand="movie")})
+    assert list(serializer.fields) == ["id", "base_price", "movie"]
+    assert isinstance(serializer.fields["movie"], MovieSerializer)
+
+    tickets = BookingSerializer(context={"request": request_with(expand="tickets")}).fields["tickets"]
+    assert isinstance(tickets.child, TicketSerializer)
+
+
+def test_sparse_fieldset_ignored_on_writes():
+    serializer = ShowSerializer(context={"request": request_with("post", fields="id")})
+    assert list(serializer.fields) == list(ShowSerializer().fields)
+
+
+def test_values_serializer_sparse_parity():
+    now = timezone.now()
+    show = Show(id=5, uuid=uuid.uuid4(), created=now, modified=now, start_time=now, base_price=120.0,
+                movie_id=2, hall_id=4, seats_available=0, seats_held=1, seats_sold=0)
+    fields = {"id", "sold_out", "movie"}
+    expected = ShowSerializer(show, context={"request": request_with(fields="id,sold_out,movie")}).data
+    row = as_row(show, ShowValuesSerializer.columns(fields))
+    assert ShowValuesSerializer.serialize([row], fields) == [expected]
+
+
+@pytest.mark.django_db
+class TestValuesListParity:
+    def list(self, viewset, fast, monkeypatch, params):
+        if not fast:
+            monkeypatch.setattr(viewset, "values_serializer_class", None)
+        request = APIRequestFactory().get("/bookings/", params, HTTP_HOST="localhost")
+        response = viewset.as_view({"get": "list"})(request)
+        monkeypatch.undo()
+        return response.data
+
+    @pytest.mark.parametrize("params", [{}, {"page_size": 2}, {"ordering": "id"}, {"ordering": "-price,id"}])
+    def test_ticket_list(self, show, monkeypatch, params):
+        fast = self.list(TicketViewSet, True, monkeypatch, params)
+        assert fast == self.list(TicketViewSet, False, monkeypatch, params)
+
+    @pytest.mark.parametrize("params", [{}, {"hall": "0"}, {"ordering": "start_time"}])
+    def test_show_list(self, show, monkeypatch, params, settings):
+        settings.RESPONSE_CACHE_TTL = 0
+        assert self.list(ShowViewSet, True, monkeypatch, params) == self.list(ShowViewSet, False, monkeypatch, params)
+
+
+@pytest.mark.django_db
+def test_bulk_writes(show, django_assert_num_queries):
+    seat_type = SeatType.objects.get()
+    seats = [Seat.objects.create(row="B", column=str(column), seat_type=seat_type, hall=show.hall) for column in [1, 2]]
+    data = [{"price": 100, "show": show.id, "seat": seat.id, "booking": 1} for seat in seats]
+
+    serializer = TicketSerializer(data=data, many=True)
+    # One in_bulk query per relation for the whole batch, then one insert.
+    with django_assert_num_queries(3):
+        assert serializer.is_valid(), serializer.errors
+        tickets = serializer.save()
+    assert [(ticket.seat_id, ticket.price, ticket.booking_id) for ticket in tickets] == [
+        (seats[0].id, 100, None), (seats[1].id, 100, None)
+    ]
+
+    tickets = Ticket.objects.filter(seat__in=seats).order_by('id')
+    serializer = TicketSerializer(
+        list(tickets), data=[{"id": ticket.id, "price": 120 + ticket.id} for ticket in tickets], many=True, partial=True
+    )
+    with django_assert_num_queries(1):
+        assert serializer.is_valid(), serializer.errors
+        serializer.save()
+    assert list(tickets.values_list('price', flat=True)) == [120.0 + ticket.id for ticket in tickets]
+
+
+@pytest.mark.parametrize("data, valid", [({}, False), ({"shows": []}, False), ({"seat_types": [2]}, True)])
+def test_reprice_needs_a_scope(data, valid):
+    assert TicketRepriceSerializer(data=data).is_valid() == valid
+
+
+def test_layout_seat_count_is_stored_on_write():
+    serializer = HallLayoutSerializer(data={"name": "Small", "spec": {"bands": [
+        {"rows": "A-B", "columns": "1-4", "seat_type": "Gold"},
+    ]}})
+    assert serializer.is_valid()
+    assert serializer.validated_data["seat_count"] == 8
+    assert not HallLayoutSerializer(data={"name": "Bad", "spec": {"bands": []}}).is_valid()
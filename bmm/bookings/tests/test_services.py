@@ -0,0 +1,355 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bmm.bookings.models import Booking, Seat, SeatType, Show, Ticket
+from bmm.bookings.serializers import BookingSerializer
+from bmm.bookings.services import (
+    BookingServices,
+    HallLayoutServices,
+    HoldNotFound,
+    InvalidLayout,
+    PricingServices,
+    SeatHoldServices,
+    ShowServices,
+    TicketServices,
+    TicketsUnavailable,
+    round_prices,
+)
+
+
+def test_layout_expand():
+    seats = HallLayoutServices.expand({"bands": [
+        {"rows": "A-B", "columns": "1-5", "gaps": [3], "seat_type": "Silver"},
+        {"rows": "C", "columns": "1-3", "seat_type": "Gold", "score": 2},
+    ]})
+    assert len(seats) == 11
+    assert ("A", "3") not in seats
+    assert seats[("A", "1")] == ("Silver", -1.0)
+    assert seats[("C", "2")] == ("Gold", 2.0)
+
+
+@pytest.mark.parametrize("spec", [
+    {},
+    {"bands": [{"rows": "A", "columns": "1-5"}]},
+    {"bands": [{"rows": "A", "columns": "1-x", "seat_type": "Gold"}]},
+    {"bands": [
+        {"rows": "A", "columns": "1-5", "seat_type": "Gold"},
+        {"rows": "A", "columns": "5", "seat_type": "Gold"},
+    ]},
+])
+def test_layout_expand_rejects_invalid_specs(spec):
+    with pytest.raises(InvalidLayout):
+        HallLayoutServices.expand(spec)
+
+
+def test_layout_diff():
+    seats = HallLayoutServices.expand({"bands": [{"rows": "A", "columns": "1-3", "seat_type": "Silver"}]})
+    other = HallLayoutServices.expand({"bands": [{"rows": "A", "columns": "2-4", "seat_type": "Silver"}]})
+    diff = HallLayoutServices.diff(seats, other)
+    assert [seat["column"] for seat in diff["added"]] == ["4"]
+    assert [seat["column"] for seat in diff["removed"]] == ["1"]
+    assert [seat["column"] for seat in diff["changed"]] == ["2", "3"]
+
+
+def test_pricing_factors(settings):
+    settings.DYNAMIC_PRICING_OCCUPANCY_TIERS = [(0.8, 1.5), (0.5, 1.2)]
+    settings.DYNAMIC_PRICING_LEAD_TIME_TIERS = [(3, 0.5), (24, 1.1)]
+    settings.DYNAMIC_PRICING_MIN_FACTOR = 0.75
+    settings.DYNAMIC_PRICING_MAX_FACTOR = 1.6
+    occupancy = np.array([0.0, 0.5, 0.79, 0.9, 0.2, 0.9])
+    hours = np.array([48, 48, 30, 24, 2, 10])
+    assert PricingServices.factors(occupancy, hours) == pytest.approx([1.0, 1.2, 1.2, 1.6, 0.75, 1.6])
+
+
+def test_pricing_factors_without_tiers(settings):
+    settings.DYNAMIC_PRICING_OCCUPANCY_TIERS = []
+    settings.DYNAMIC_PRICING_LEAD_TIME_TIERS = []
+    assert PricingServices.factors(np.array([0.9]), np.array([1.0])) == pytest.approx([1.0])
+
+
+def book(ticket_ids, paid=False):
+    serializer = BookingSerializer(data={'ticket_ids': [str(ticket_id) for ticket_id in ticket_ids], 'paid': paid})
+    serializer.is_valid(raise_exception=True)
+    return BookingServices.create_booking(serializer)
+
+
+@pytest.mark.django_db
+def test_claim_rejects_partially_booked_tickets(show):
+    first, second, third = Ticket.objects.filter(show=show).order_by('id').values_list('id', flat=True)[:3]
+    booking = book([first])
+
+    with pytest.raises(TicketsUnavailable) as e:
+        book([first, second])
+    assert e.value.ticket_ids == [first]
+    # Nothing of the rejected booking is left behind, its other ticket stays free.
+    assert Booking.objects.count() == 1
+    assert Ticket.objects.get(id=second).booking_id is None
+
+    claimed = TicketServices.claim_tickets([str(third), third], booking.id)
+    assert claimed == [(third, 150.0, show.id)]
+
+
+@pytest.mark.django_db
+def test_release_expired_bookings(show, settings):
+    settings.BOOKING_SWEEP_CHUNK_SIZE = 1
+    ShowServices.reconcile_seat_counts([show.id])
+    first, second, third, fourth = Ticket.objects.filter(show=show).order_by('id').values_list('id', flat=True)[:4]
+    expired, other_expired, fresh, paid = book([first]), book([second]), book([third]), book([fourth], paid=True)
+    Booking.objects.exclude(id=fresh.id).update(
+        modified=timezone.now() - timedelta(seconds=settings.BOOKING_HOLD_TTL + 1)
+    )
+
+    assert BookingServices.release_expired_bookings() == 2
+    assert set(Booking.objects.values_list('id', flat=True)) == {fresh.id, paid.id}
+    assert set(Ticket.objects.filter(show=show, booking__isnull=True).values_list('id', flat=True)) == \
+        set(Ticket.objects.filter(show=show).exclude(id__in=[third, fourth]).values_list('id', flat=True))
+    show.refresh_from_db()
+    assert (show.seats_available, show.seats_held, show.seats_sold) == (3, 1, 1)
+    assert BookingServices.release_expired_bookings() == 0
+
+
+@pytest.mark.django_db
+def test_seat_holds(show, settings):
+    cache.clear()
+    first, second, third = Ticket.objects.filter(show=show).order_by('id').values_list('id', flat=True)[:3]
+    hold = SeatHoldServices.hold(show.id, [second, first, first])
+    assert (hold['ticket_ids'], hold['expires_in']) == ([first, second], settings.SEAT_HOLD_TTL)
+    assert SeatHoldServices.held_by_others([(first, show.id), (third, show.id)]) == [first]
+    assert SeatHoldServices.held_by_others([(first, show.id)], hold['token']) == []
+
+    # A conflicting hold takes nothing, not even its free tickets.
+    with pytest.raises(TicketsUnavailable):
+        SeatHoldServices.hold(show.id, [third, second])
+    assert SeatHoldServices.held_by_others([(third, show.id)]) == []
+
+    assert SeatHoldServices.extend(hold['token'])['expires_in'] == settings.SEAT_HOLD_TTL
+
+    # First ticket's key expired and another hold took it, releasing must leave it to that hold.
+    cache.delete(SeatHoldServices._ticket_key(show.id, first))
+    other = SeatHoldServices.hold(show.id, [first])
+    SeatHoldServices.release(hold['token'])
+    assert SeatHoldServices.held_by_others([(first, show.id), (second, show.id)], other['token']) == []
+    assert SeatHoldServices.held_by_others([(first, show.id)]) == [first]
+    with pytest.raises(HoldNotFound):
+        SeatHoldServices.extend(hold['token'])
+
+    with pytest.raises(TicketsUnavailable):
+        SeatHoldServices.hold(show.id, [first, second])
+
+
+@pytest.mark.django_db
+def test_paying_a_booking_moves_its_seats_once(show):
+    ShowServices.reconcile_seat_counts([show.id])
+    ticket_ids = [str(ticket_id) for ticket_id in Ticket.objects.filter(show=show).values_list('id', flat=True)[:2]]
+    serializer = BookingSerializer(data={'ticket_ids': ticket_ids})
+    serializer.is_valid(raise_exception=True)
+    booking = BookingServices.create_booking(serializer)
+
+    # Both requests were validated against the same unpaid instance, as concurrent requests would be.
+    stale = Booking.objects.get(id=booking.id)
+    for instance in [stale, Booking.objects.get(id=booking.id)]:
+        serializer = BookingSerializer(instance, data={'paid': True}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        BookingServices.update_booking(serializer)
+
+    show.refresh_from_db()
+    assert (show.seats_available, show.seats_held, show.seats_sold) == (3, 0, 2)
+
+    assert BookingServices.release_bookings([booking.id], unpaid_only=True) == []
+    show.refresh_from_db()
+    assert show.seats_sold == 2
+
+
+@pytest.mark.django_db
+def test_booking_created_paid_counts_sold_seats(show):
+    ShowServices.reconcile_seat_counts([show.id])
+    show.refresh_from_db()
+    modified = show.modified
+    ticket_ids = [str(ticket_id) for ticket_id in Ticket.objects.filter(show=show).values_list('id', flat=True)[:2]]
+    serializer = BookingSerializer(data={'ticket_ids': ticket_ids, 'paid': True})
+    serializer.is_valid(raise_exception=True)
+    BookingServices.create_booking(serializer)
+
+    show.refresh_from_db()
+    assert (show.seats_available, show.seats_held, show.seats_sold) == (3, 0, 2)
+    # Counters are part of show responses, their validators must change with them.
+    assert show.modified > modified
+    assert ShowServices.reconcile_seat_counts([show.id]) == []
+
+
+@pytest.mark.django_db
+def test_reconcile_resets_counters_of_shows_without_tickets(show):
+    Ticket.all_objects.filter(show=show).delete()
+    Show.objects.filter(id=show.id).update(seats_available=5, seats_held=1)
+    assert ShowServices.reconcile_seat_counts([show.id]) == [show.id]
+    show.refresh_from_db()
+    assert (show.seats_available, show.seats_held, show.seats_sold) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_schedule_shows_command_reports_conflicts(show):
+    with pytest.raises(CommandError, match=f"overlaps show {show.id}"):
+        call_command(
+            "schedule_shows", movie=show.movie_id, hall=show.hall_id, base_price=100,
+            start_date="2030-01-01", end_date="2030-01-02", start_times="19:00",
+        )
+    assert Show.objects.filter(hall=show.hall).count() == 1
+
+
+@pytest.fixture
+def priced_shows(settings, monkeypatch):
+    """Shows 3 (half sold, factor 1.1), 7 and 11 (no tickets) with unsold tickets of seat types 5 and 9."""
+    settings.DYNAMIC_PRICING_OCCUPANCY_TIERS = [(0.5, 1.1)]
+    settings.DYNAMIC_PRICING_LEAD_TIME_TIERS = []
+    start_time = timezone.now() + timedelta(days=2)
+    shows = [
+        (3, 100.0, 1.0, start_time, 1, 0, 1),
+        (7, 200.0, 1.0, start_time, 2, 0, 0),
+        (11, 50.0, 1.0, start_time, 0, 0, 0),
+    ]
+    tickets = [(1, 3, 5, 1.5, 150.0), (2, 7, 5, 1.5, 300.0), (3, 7, 9, 2.0, 400.004), (4, 7, 9, 2.0, 390.0)]
+    monkeypatch.setattr(PricingServices, '_shows', lambda show_ids, now, lock=False: shows)
+    monkeypatch.setattr(PricingServices, '_tickets', lambda show_ids: tickets)
+    return tickets
+
+
+def test_pricing_matrix(priced_shows):
+    priced = PricingServices._price([3, 7, 11])
+    assert priced['seat_types'].tolist() == [5, 9]
+    assert priced['matrix'].tolist() == [[165.0, 300.0, 75.0], [220.0, 400.0, 100.0]]
+    assert priced['prices'].tolist() == [165.0, 300.0, 400.0, 400.0]
+    # Off by less than a cent is not a change.
+    assert priced['changed'].tolist() == [True, False, False, True]
+
+
+def test_pricing_quote(priced_shows):
+    quotes = {quote['show']: quote for quote in PricingServices.quote([3, 7, 11])}
+    assert quotes[3]['prices'] == {5: 165.0}
+    assert quotes[7]['prices'] == {5: 300.0, 9: 400.0}
+    assert quotes[11]['prices'] == {}
+    assert [(quotes[show_id]['tickets'], quotes[show_id]['repriced_tickets']) for show_id in [3, 7, 11]] == [
+        (1, 1), (3, 1), (0, 0)
+    ]
+    assert quotes[3]['occupancy'] == 0.5
+    assert (quotes[3]['quoted_price_factor'], quotes[7]['quoted_price_factor']) == (1.1, 1.0)
+
+
+def test_pricing_quote_without_tickets(priced_shows):
+    priced_shows.clear()
+    assert [quote['prices'] for quote in PricingServices.quote([3, 7, 11])] == [{}, {}, {}]
+
+
+def test_pricing_rounds_like_sql():
+    assert round_prices(np.array([1.005, 2.675, 165.00000000000003, 0.125])).tolist() == [1.01, 2.68, 165.0, 0.13]
+
+
+def test_layout_rejects_huge_ranges_before_expanding(settings):
+    settings.HALL_LAYOUT_MAX_SEATS = 100
+    with pytest.raises(InvalidLayout):
+        HallLayoutServices.expand({"bands": [{"rows": "A", "columns": "1-2000000000", "seat_type": "Gold"}]})
+    with pytest.raises(InvalidLayout):
+        HallLayoutServices.expand({"bands": [{"rows": "A", "columns": "1-60,1-60", "seat_type": "Gold"}]})
+
+
+def test_quote_selections(monkeypatch):
+    queries = []
+
+    def quoted_tickets(ticket_ids):
+        queries.append(ticket_ids)
+        # Ticket 4 is booked, 5 and 6 are held, 9 is unknown or of a past show.
+        tickets = {1: (10, 150.0, None), 2: (10, 150.0, None), 4: (10, 150.0, 8), 5: (10, 200.0, None),
+                   6: (11, 200.0, None)}
+        return [(ticket_id, *tickets[ticket_id]) for ticket_id in ticket_ids if ticket_id in tickets]
+
+    monkeypatch.setattr(TicketServices, '_quoted_tickets', quoted_tickets)
+    monkeypatch.setattr(cache, 'get_many', lambda keys: {
+        SeatHoldServices._ticket_key(10, 5): "mine", SeatHoldServices._ticket_key(11, 6): "theirs",
+    })
+
+    quotes = TicketServices.quote_selections([[2, 1, 2], [1, 4], [5], [6, 9]], hold_token="mine")
+    assert queries == [[1, 2, 4, 5, 6, 9]]
+    assert [(quote['ticket_ids'], quote['available'], quote['booking_price']) for quote in quotes] == [
+        ([1, 2], True, 300.0), ([1, 4], False, 300.0), ([5], True, 200.0), ([6, 9], False, 200.0)
+    ]
+    assert quotes[1]['already_booked_ticket_ids'] == [4]
+    assert (quotes[3]['held_ticket_ids'], quotes[3]['missing_ticket_ids']) == ([6], [9])
+
+
+def row(name, columns, scores=None, taken=()):
+    """best_blocks tickets of a row, ticket ID's are row name and column."""
+    scores = scores or [0] * len(columns)
+    return [(f"{name}{column}", name, str(column), score, column not in taken)
+            for column, score in zip(columns, scores)]
+
+
+def test_best_blocks_break_at_aisles():
+    tickets = row("A", [1, 2, 3, 5, 6])
+    assert BookingServices.best_blocks(tickets, 3, 10) == [["A1", "A2", "A3"]]
+    assert BookingServices.best_blocks(tickets, 2, 10) == [["A1", "A2"], ["A2", "A3"], ["A5", "A6"]]
+    assert BookingServices.best_blocks(tickets, 4, 10) == []
+
+
+def test_best_blocks_skip_taken_seats():
+    # Seats booked, held or of another seat type all come in as not free.
+    tickets = row("A", [5, 4, 3, 2, 1], taken={3})
+    assert BookingServices.best_blocks(tickets, 2, 10) == [["A1", "A2"], ["A4", "A5"]]
+    assert BookingServices.best_blocks(row("A", [1, 2, 3], taken={1, 3}), 1, 10) == [["A2"]]
+
+
+def test_best_blocks_rank_by_score():
+    tickets = row("A", [1, 2, 3, 4], [0, 1, 1, 0]) + row("B", [1, 2, 3, 4], [2, 2, 0, 0])
+    assert BookingServices.best_blocks(tickets, 2, 3) == [["B1", "B2"], ["A2", "A3"], ["B2", "B3"]]
+    assert len(BookingServices.best_blocks(tickets, 2, 10)) == 6
+
+
+def test_best_blocks_of_named_columns():
+    tickets = row("A", ["L", "M", "N"])
+    assert BookingServices.best_blocks(tickets, 3, 10) == [["AL", "AM", "AN"]]
+
+
+@pytest.mark.django_db
+def test_book_best_available_of_seat_type(show):
+    ShowServices.reconcile_seat_counts([show.id])
+    tickets = dict(Ticket.objects.filter(show=show).values_list('seat__column', 'id'))
+    silver = SeatType.objects.create(name="Silver", price_multiplier=1.0, theatre=show.hall.theatre)
+    Seat.objects.filter(hall=show.hall, column__in=["2", "3"]).update(seat_type=silver)
+
+    booking = BookingServices.book_best_available(show.id, 2, seat_type_id=silver.id)
+    assert sorted(booking.ticket_ids) == sorted([str(tickets["2"]), str(tickets["3"])])
+    with pytest.raises(TicketsUnavailable):
+        BookingServices.book_best_available(show.id, 2, seat_type_id=silver.id)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_book_best_available_skips_locked_blocks(show):
+    ShowServices.reconcile_seat_counts([show.id])
+    tickets = dict(Ticket.objects.filter(show=show).values_list('seat__column', 'id'))
+    locked, done = threading.Event(), threading.Event()
+
+    def other_allocator():
+        # Locks the best block (seats 1 and 2) as a concurrent allocator about to claim it would.
+        try:
+            with transaction.atomic():
+                list(Ticket.objects.select_for_update().filter(id__in=[tickets["1"], tickets["2"]]))
+                locked.set()
+                done.wait(10)
+        finally:
+            locked.set()
+            connection.close()
+
+    thread = threading.Thread(target=other_allocator)
+    thread.start()
+    try:
+        assert locked.wait(10)
+        booking = BookingServices.book_best_available(show.id, 2)
+    finally:
+        done.set()
+        thread.join()
+    assert sorted(booking.ticket_ids) == sorted([str(tickets["3"]), str(tickets["4"])])
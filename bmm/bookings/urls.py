@@ -6,11 +6,15 @@ from bmm.bookings.api import (
     MovieViewSet,
     TheatreViewSet,
     HallViewSet,
+    HallLayoutViewSet,
     SeatTypeViewSet,
     SeatViewSet,
     ShowViewSet,
     BookingViewSet,
     TicketViewSet,
+    SeatHoldViewSet,
+    AutocompleteViewSet,
+    ShowListingViewSet,
 )
 
 
@@ -19,11 +23,15 @@ api_router = routers.SimpleRouter(trailing_slash=False)
 api_router.register(r'movies', MovieViewSet)
 api_router.register(r'theatres', TheatreViewSet)
 api_router.register(r'halls', HallViewSet)
+api_router.register(r'layouts', HallLayoutViewSet)
 api_router.register(r'seat_types', SeatTypeViewSet)
 api_router.register(r'seats', SeatViewSet)
 api_router.register(r'shows', ShowViewSet)
 api_router.register(r'bookings', BookingViewSet)
 api_router.register(r'tickets', TicketViewSet)
+api_router.register(r'holds', SeatHoldViewSet, basename='hold')
+api_router.register(r'autocomplete', AutocompleteViewSet, basename='autocomplete')
+api_router.register(r'listings', ShowListingViewSet)
 
 api_urlpatterns = api_router.urls
 
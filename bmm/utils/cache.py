@@ -0,0 +1,107 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django_redis import get_redis_connection as get_django_redis_connection
+from rest_framework.response import Response
+
+from bmm.utils.serializers import requested_expansions
+
+
+def get_redis_connection(alias="default"):
+    """Raw redis client behind cache `alias`, or None when the cache is not backed by redis."""
+    if "django_redis" not in settings.CACHES[alias]["BACKEND"]:
+        return None
+    return get_django_redis_connection(alias)
+
+
+def _generation_key(model):
+    return f"generation:{model._meta.label_lower}"
+
+
+def get_generations(models):
+    """
+    Current cache generation of every model in `models`, in the same order.
+
+    Missing counters (never bumped or evicted) start from the current time in milliseconds rather
+    than zero, so an evicted counter can never come back to a value older responses were cached under.
+    """
+    keys = [_generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            generations[key] = cache.get(key, 0)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(models):
+    """Invalidates every response cached under the current generation of `models`."""
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+class CacheResponseMixin:
+    """
+    Caches successful list responses of a viewset.
+
+    Keys are made from the action, lookup, normalized query parameters (sorted, empty ones dropped)
+    and the generations of `cache_models` (defaults to the queryset model) plus models of relations
+    expanded with `?expand=`, so any save or delete of those models, which bumps their generation,
+    makes earlier responses unreachable.
+
+    Put it before ConditionalGetMixin: ETag and Last-Modified are cached with the response, so a hit
+    answers conditional requests without the validators query. Retrieve is not cached, it would skip
+    `get_object()` and with it object permission checks.
+    """
+    cache_models = None
+    cache_timeout = None
+
+    def get_cache_models(self):
+        models = list(self.cache_models or [self.get_queryset().model])
+        # Relations expanded with `?expand=` are rendered from their own models, their saves must invalidate too.
+        serializer_class = self.get_serializer_class()
+        expandable = getattr(serializer_class, 'get_expandable_fields', dict)()
+        for name in sorted((requested_expansions(self.request) or set()) & set(expandable)):
+            model = serializer_class.Meta.model._meta.get_field(name).related_model
+            if model not in models:
+                models.append(model)
+        return models
+
+    def get_cache_key(self, request, **kwargs):
+        params = sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values if value != ''
+        )
+        generations = get_generations(self.get_cache_models())
+        raw = repr((request.get_host(), request.accepted_renderer.format, sorted(kwargs.items()), params))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        return f"response:{self.basename}:{self.action}:{'.'.join(map(str, generations))}:{digest}"
+
+    def cached_response(self, request, view, *args, **kwargs):
+        key = self.get_cache_key(request, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            last_modified = parse_http_date_safe(headers['Last-Modified']) if 'Last-Modified' in headers else None
+            response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+            if response is None:
+                response = Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TTL
+            headers = {header: response[header] for header in ['ETag', 'Last-Modified'] if response.has_header(header)}
+            cache.set(key, (response.data, headers), timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
@@ -35,6 +35,13 @@ class BaseModel(TimeStampedModel):
 
     class Meta:
         abstract = True
+        indexes = [
+            # Backs cursor pagination of API list endpoints, which pages live rows by (created, id).
+            models.Index(
+                fields=['created', 'id'], name='%(app_label)s_%(class)s_created_idx',
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
 
     def __unicode__(self):
         return "%s" % self.uuid
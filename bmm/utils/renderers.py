@@ -0,0 +1,44 @@
+import orjson
+from django.http.multipartparser import parse_header
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop in replacement of DRF's JSONRenderer built on orjson.
+
+    UUID, datetime, date and time are encoded natively, everything else orjson does not know
+    (Decimal, lazy strings, querysets...) goes through DRF's own JSONEncoder, so output matches
+    JSONRenderer apart from whitespace.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=self.default, option=options)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        # Same as JSONRenderer, clients can ask for indented output with `Accept: application/json; indent=2`.
+        if accepted_media_type:
+            _, params = parse_header(accepted_media_type.encode('ascii'))
+            if 'indent' in params:
+                return True
+        return bool(renderer_context.get('indent', None))
+
+
+class StdlibJSONRenderer(JSONRenderer):
+    """
+    DRF's stdlib json based JSONRenderer under its own media type, so a client can still choose it with
+    `Accept: application/vnd.bmm.stdlib+json` or `?format=stdlib-json` while ORJSONRenderer serves JSON.
+    """
+    media_type = 'application/vnd.bmm.stdlib+json'
+    format = 'stdlib-json'
@@ -0,0 +1,195 @@
+import sys
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.serializers import ListSerializer
+
+
+def _param_set(request, name):
+    if request is None or request.method not in SAFE_METHODS or not request.query_params.get(name):
+        return None
+    return {field.strip() for field in request.query_params[name].split(',') if field.strip()}
+
+
+def requested_fields(request):
+    """Field names asked for with `?fields=a,b` on a read request, None if all fields are wanted."""
+    return _param_set(request, 'fields')
+
+
+def requested_expansions(request):
+    """Relations asked to be expanded with `?expand=a,b` on a read request, None if none are."""
+    return _param_set(request, 'expand')
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and opt in expansion for ModelSerializers on read requests.
+
+    `?fields=id,price` keeps only the listed fields, `?expand=movie,hall` replaces primary keys of
+    relations listed in `Meta.expandable_fields` (name -> serializer class, or its name in the
+    serializer's module) with nested objects. Only the top level serializer of a request is affected,
+    expanded serializers are rendered in full and not expanded further.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request', None)
+        expand = requested_expansions(request) or set()
+        for name in sorted(expand & set(self.get_expandable_fields())):
+            self.fields[name] = self.get_expanded_serializer(name)
+
+        fields = requested_fields(request)
+        if fields is not None:
+            for name in set(self.fields) - fields - expand:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_expandable_fields(cls):
+        return getattr(cls.Meta, 'expandable_fields', {})
+
+    def get_expanded_serializer(self, name):
+        serializer_class = self.get_expandable_fields()[name]
+        if isinstance(serializer_class, str):
+            serializer_class = getattr(sys.modules[type(self).__module__], serializer_class)
+        field = self.Meta.model._meta.get_field(name)
+        return serializer_class(read_only=True, many=field.one_to_many or field.many_to_many)
+
+
+class ValuesSerializer:
+    """
+    Read only list serializer rendering `.values()` rows in exactly the shape of `serializer_class`.
+
+    Field mappers are compiled once per class from the fields of `serializer_class`: model fields
+    map their column through the field's own to_representation, primary key related fields pass
+    the foreign key column through, and anything else (properties, method fields) has to be declared
+    in `computed_fields` as name -> (columns, function taking those columns).
+    """
+    serializer_class = None
+    computed_fields = {}
+
+    @classmethod
+    def compile(cls):
+        model = cls.serializer_class.Meta.model
+        mappers = []
+        for name, field in cls.serializer_class().fields.items():
+            if name in cls.computed_fields:
+                columns, function = cls.computed_fields[name]
+                mappers.append((name, tuple(columns), function, True))
+                continue
+            try:
+                column = model._meta.get_field(field.source).attname
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{cls.__name__} cannot map field '{name}' of {cls.serializer_class.__name__} to a column,"
+                    f" declare it in computed_fields."
+                )
+            if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+                mappers.append((name, (column,), None, False))
+            else:
+                mappers.append((name, (column,), field.to_representation, False))
+        return mappers
+
+    @classmethod
+    def get_mappers(cls):
+        # Compiled per class, subclasses must not reuse mappers of their parent.
+        if '_mappers' not in cls.__dict__:
+            cls._mappers = cls.compile()
+        return cls._mappers
+
+    @classmethod
+    def get_mappers_of(cls, fields=None):
+        """Mappers of `fields` only (all fields if None), for `?fields=` requests."""
+        mappers = cls.get_mappers()
+        return mappers if fields is None else [mapper for mapper in mappers if mapper[0] in fields]
+
+    @classmethod
+    def columns(cls, fields=None):
+        columns = []
+        for _, names, _, _ in cls.get_mappers_of(fields):
+            columns.extend(column for column in names if column not in columns)
+        return columns
+
+    @classmethod
+    def serialize(cls, rows, fields=None):
+        mappers = cls.get_mappers_of(fields)
+        data = []
+        for row in rows:
+            item = {}
+            for name, columns, function, computed in mappers:
+                if computed:
+                    item[name] = function(*[row[column] for column in columns])
+                    continue
+                value = row[columns[0]]
+                item[name] = value if value is None or function is None else function(value)
+            data.append(item)
+        return data
+
+
+class PrefetchedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField resolving ids from `prefetched` (filled by BulkListSerializer with one
+    query per relation for a whole batch) before falling back to a query per value.
+    """
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is not None and not isinstance(data, bool):
+            try:
+                return self.prefetched[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(ListSerializer):
+    """
+    List serializer writing a batch with one bulk_create or bulk_update.
+
+    Related objects of the whole batch are fetched with one in_bulk query per relation before items
+    are validated. Signals are not sent and save() of the model is not called, subclasses fill in
+    derived columns in `prepare` and list them in `derived_fields` so bulk updates write them too.
+    """
+    derived_fields = []
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prefetch_related_objects(data)
+        return super().to_internal_value(data)
+
+    def prefetch_related_objects(self, data):
+        for name, field in self.child.fields.items():
+            if not isinstance(field, PrefetchedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            ids = {item.get(name) for item in data if isinstance(item, dict)}
+            ids = {int(value) for value in ids if isinstance(value, int) or str(value).isdigit()}
+            field.prefetched = field.get_queryset().in_bulk(ids)
+
+    def prepare(self, instance):
+        pass
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        for instance in instances:
+            self.prepare(instance)
+        return model.objects.bulk_create(instances)
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        now = timezone.now()
+        fields = {'modified'} | set(self.derived_fields)
+        for instance, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+            instance.modified = now
+            self.prepare(instance)
+        model.objects.bulk_update(instances, sorted(fields))
+        return instances
+
+
+class BulkSerializerMixin:
+    """Resolves primary key relations of ModelSerializers through PrefetchedPrimaryKeyRelatedField."""
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
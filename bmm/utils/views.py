@@ -0,0 +1,240 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+
+from bmm.utils.cache import bump_generations
+from bmm.utils.serializers import requested_expansions, requested_fields
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GET support for list and retrieve of viewsets over BaseModel querysets.
+
+    Retrieve gets a strong ETag and Last-Modified from the object's `modified`, list gets validators
+    from max `modified` and count of the filtered queryset, both read with one small query before
+    anything is serialized, so a matching If-None-Match / If-Modified-Since returns 304 right away.
+    Set `conditional_list = False` where counting the filtered queryset is too expensive.
+    Responses with `?expand=` are not conditional, their validators would miss changes of related objects.
+    """
+    conditional_list = True
+
+    def _etag(self, request, *parts, weak=False):
+        raw = repr((self.basename, self.action, request.accepted_renderer.format) + parts)
+        etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+        return f"W/{etag}" if weak else etag
+
+    def _conditional_response(self, request, view, etag, last_modified, *args, **kwargs):
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.conditional_list or requested_expansions(request):
+            return super().list(request, *args, **kwargs)
+        # Pagination cursor and filters are part of query parameters, so they go into the ETag too.
+        validators = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            last_modified=Max('modified'), count=Count('id')
+        )
+        params = sorted(request.query_params.lists())
+        etag = self._etag(request, validators['last_modified'], validators['count'], params, weak=True)
+        return self._conditional_response(
+            request, super().list, etag, validators['last_modified'], *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if requested_expansions(request):
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            modified = self.get_queryset().filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            ).values_list('modified', flat=True).first()
+        except (TypeError, ValueError):
+            modified = None
+        if modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        params = sorted(request.query_params.lists())
+        etag = self._etag(request, kwargs[lookup_url_kwarg], modified.isoformat(), params)
+        return self._conditional_response(request, super().retrieve, etag, modified, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Opt in fast list path of a viewset: with `values_serializer_class` set to a ValuesSerializer, list
+    pages are read with `.values()` and rendered by it instead of building and serializing instances.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        # Expanded relations need instances, sparse fieldsets are served by the fast path too.
+        if self.values_serializer_class is None or requested_expansions(request):
+            return super().list(request, *args, **kwargs)
+
+        fields = requested_fields(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = self.values_serializer_class.columns(fields)
+        # Cursor pagination reads its position from the ordering fields of the rows.
+        if self.paginator is not None and hasattr(self.paginator, 'get_ordering'):
+            ordering = self.paginator.get_ordering(request, queryset, self)
+            columns += [field.lstrip('-') for field in ordering if field.lstrip('-') not in columns]
+
+        page = self.paginate_queryset(queryset.values(*columns))
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer_class.serialize(page, fields))
+        return Response(self.values_serializer_class.serialize(queryset.values(*columns), fields))
+
+
+class DynamicFieldsViewMixin:
+    """
+    Adapts the queryset of read requests to `?fields=` and `?expand=` of a DynamicFieldsMixin serializer:
+    sparse fieldsets load only their columns (plus primary key and ordering fields), expanded forward
+    relations are joined with select_related and reverse ones fetched with prefetch_related.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = getattr(self, 'request', None)
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, 'get_expandable_fields'):
+            return queryset
+
+        model = queryset.model
+        expand = (requested_expansions(request) or set()) & set(serializer_class.get_expandable_fields())
+        for name in sorted(expand):
+            field = model._meta.get_field(name)
+            if field.one_to_many or field.many_to_many:
+                queryset = queryset.prefetch_related(name)
+            else:
+                queryset = queryset.select_related(name)
+
+        fields = requested_fields(request)
+        if fields is not None:
+            columns = self.get_sparse_columns(request, model, serializer_class, fields | expand)
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+    def get_sparse_columns(self, request, model, serializer_class, fields):
+        """Model fields backing `fields`, None if any of them is not a plain model field."""
+        ordering = request.query_params.get('ordering', None)
+        ordering = ordering.split(',') if ordering else (getattr(self, 'ordering', None) or [])
+        columns = {model._meta.pk.name}
+        columns.update(
+            field.strip().lstrip('-') for field in ordering
+            if field.strip().lstrip('-') in {f.name for f in model._meta.concrete_fields}
+        )
+
+        declared = serializer_class().get_fields()
+        for name in fields & set(declared):
+            try:
+                # Fields are not bound yet, source is only set when it differs from the name.
+                field = model._meta.get_field(declared[name].source or name)
+            except FieldDoesNotExist:
+                return None
+            if field.concrete:
+                columns.add(field.name)
+        return sorted(columns)
+
+
+class BatchMixin:
+    """
+    Batch endpoints of a ModelViewSet, each handling up to BATCH_MAX_SIZE objects:
+
+    - `GET ?ids=1,2,3` lists exactly those objects, unpaginated.
+    - `POST` with a list payload creates all of them with one bulk_create.
+    - `PATCH bulk` with a list of objects carrying their `id` updates them with one bulk_update.
+
+    Writes are validated as a batch (see BulkListSerializer) and run in one transaction. Model signals
+    are not sent for them, viewsets do what their receivers would do in `after_bulk_write`.
+    Set `bulk_writes = False` where rows must not be written around their services.
+    """
+    bulk_writes = True
+
+    def get_batch_ids(self):
+        if self.action != 'list' or 'ids' not in self.request.query_params:
+            return None
+        ids = [value.strip() for value in self.request.query_params['ids'].split(',') if value.strip()]
+        if not all(value.isdigit() for value in ids):
+            raise ValidationError({'ids': "ID's must be integers."})
+        self.check_batch_size(ids)
+        return [int(value) for value in ids]
+
+    def check_batch_size(self, items):
+        if len(items) > settings.BATCH_MAX_SIZE:
+            raise ValidationError(f"At most {settings.BATCH_MAX_SIZE} objects can be handled in one request.")
+
+    def check_bulk_writes(self, data):
+        if not self.bulk_writes:
+            raise ValidationError("Bulk writes are not supported for this resource.")
+        if not data or not all(isinstance(item, dict) for item in data):
+            raise ValidationError("Expected a non empty list of objects.")
+        self.check_batch_size(data)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        ids = self.get_batch_ids()
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        if self.get_batch_ids() is not None:
+            return None
+        return super().paginate_queryset(queryset)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        self.check_bulk_writes(request.data)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_write(serializer, created=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request, *args, **kwargs):
+        data = request.data if isinstance(request.data, list) else []
+        self.check_bulk_writes(data)
+        ids = [item.get('id') for item in data]
+        if not all(isinstance(value, int) for value in ids) or len(set(ids)) != len(ids):
+            raise ValidationError({'id': "Every object needs a distinct integer id."})
+        instances = self.get_bulk_queryset().in_bulk(ids)
+        missing = [value for value in ids if value not in instances]
+        if missing:
+            raise NotFound(f"Objects with ID's: {missing} do not exist.")
+
+        serializer = self.get_serializer([instances[value] for value in ids], data=data, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_bulk_write(serializer, created=False)
+        return Response(serializer.data)
+
+    def get_bulk_queryset(self):
+        """Queryset bulk updated objects are read from, select relations their validation reads here."""
+        return self.get_queryset()
+
+    def perform_bulk_write(self, serializer, created):
+        fields = {name for item in serializer.validated_data for name in item}
+        with transaction.atomic():
+            instances = serializer.save()
+            self.after_bulk_write(instances, created, fields)
+
+    def after_bulk_write(self, instances, created, fields):
+        """Runs in the write's transaction, `fields` are the names of fields written to any of `instances`."""
+        model = self.get_queryset().model
+        transaction.on_commit(lambda: bump_generations([model]))
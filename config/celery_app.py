@@ -17,10 +17,30 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 app.conf.beat_schedule = {
-    # Every 30 minutes, it checks and
-    'delete_if_unpaid': {
-        'task': 'delete_if_unpaid',
-        'schedule': 1800.0,
+    # Every minute, it releases tickets of bookings which are still unpaid after BOOKING_HOLD_TTL.
+    'release_expired_bookings': {
+        'task': 'release_expired_bookings',
+        'schedule': 60.0,
+    },
+    # Every 10 minutes, it refreshes popularity scores and cities of autocomplete suggestions.
+    'rebuild_autocomplete_index': {
+        'task': 'rebuild_autocomplete_index',
+        'schedule': 600.0,
+    },
+    # Every hour, it reconciles show listings and drops listings of past shows.
+    'refresh_show_listings': {
+        'task': 'refresh_show_listings',
+        'schedule': 3600.0,
+    },
+    # Every 15 minutes, it repairs seat counters of shows which drifted from their tickets.
+    'reconcile_show_seat_counts': {
+        'task': 'reconcile_show_seat_counts',
+        'schedule': 900.0,
+    },
+    # Every 15 minutes, it reprices unsold tickets of upcoming shows from occupancy and time to showtime.
+    'price_upcoming_shows': {
+        'task': 'price_upcoming_shows',
+        'schedule': 900.0,
     },
 }
 
@@ -302,9 +302,58 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_PERMISSION_CLASSES": (),
     # "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # orjson based JSON first, stdlib json stays selectable per request through StdlibJSONRenderer's media type.
+    "DEFAULT_RENDERER_CLASSES": (
+        "bmm.utils.renderers.ORJSONRenderer",
+        "bmm.utils.renderers.StdlibJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "bmm.utils.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
 CORS_URLS_REGEX = r"^/api/.*$"
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Seconds an unpaid booking keeps its tickets before the sweeper releases them.
+BOOKING_HOLD_TTL = env.int("BOOKING_HOLD_TTL", default=100)
+# Number of expired bookings released per transaction by the sweeper.
+BOOKING_SWEEP_CHUNK_SIZE = env.int("BOOKING_SWEEP_CHUNK_SIZE", default=1000)
+# Seconds a seat hold lives in cache unless extended.
+SEAT_HOLD_TTL = env.int("SEAT_HOLD_TTL", default=300)
+# Seconds the seat map layout and sold seats bitmap of a show are cached for.
+SEATMAP_CACHE_TTL = env.int("SEATMAP_CACHE_TTL", default=300)
+# Number of shows per ticket generation task when scheduling shows in bulk.
+SHOW_SCHEDULE_CHUNK_SIZE = env.int("SHOW_SCHEDULE_CHUNK_SIZE", default=50)
+# Maximum number of days shows can be scheduled for in one request.
+SHOW_SCHEDULE_MAX_DAYS = env.int("SHOW_SCHEDULE_MAX_DAYS", default=90)
+# List endpoints and admin changelists using estimated counts switch from COUNT(*) to planner
+# estimates once the estimate reaches this many rows.
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = env.int("PAGINATION_COUNT_ESTIMATE_THRESHOLD", default=10000)
+# Longest name prefix indexed for autocomplete, longer queries are cut to it.
+AUTOCOMPLETE_MAX_PREFIX_LENGTH = env.int("AUTOCOMPLETE_MAX_PREFIX_LENGTH", default=15)
+# Most seats a single best available booking can ask for.
+BEST_AVAILABLE_MAX_SEATS = env.int("BEST_AVAILABLE_MAX_SEATS", default=10)
+# Best scoring seat blocks tried (skipping blocks locked by concurrent bookings) before giving up.
+BEST_AVAILABLE_CANDIDATES = env.int("BEST_AVAILABLE_CANDIDATES", default=20)
+# Seconds catalog list responses are cached for, saves and deletes invalidate them earlier.
+RESPONSE_CACHE_TTL = env.int("RESPONSE_CACHE_TTL", default=300)
+# Most objects one batch request (`?ids=`, list payload create, bulk update) can handle.
+BATCH_MAX_SIZE = env.int("BATCH_MAX_SIZE", default=500)
+# Most seats a hall layout can expand to.
+HALL_LAYOUT_MAX_SEATS = env.int("HALL_LAYOUT_MAX_SEATS", default=5000)
+# Dynamic pricing tiers as (minimum occupancy, factor), the highest tier a show reached applies.
+DYNAMIC_PRICING_OCCUPANCY_TIERS = [(0.5, 1.1), (0.8, 1.25), (0.95, 1.5)]
+# Dynamic pricing tiers as (hours to showtime, factor), the nearest tier a show is within applies.
+DYNAMIC_PRICING_LEAD_TIME_TIERS = [(3, 0.9), (24, 1.05)]
+# Bounds of the combined dynamic pricing factor.
+DYNAMIC_PRICING_MIN_FACTOR = env.float("DYNAMIC_PRICING_MIN_FACTOR", default=0.8)
+DYNAMIC_PRICING_MAX_FACTOR = env.float("DYNAMIC_PRICING_MAX_FACTOR", default=2.0)
+# Number of shows priced per transaction by the dynamic pricing job.
+DYNAMIC_PRICING_CHUNK_SIZE = env.int("DYNAMIC_PRICING_CHUNK_SIZE", default=200)
+# Most alternative ticket selections one quote request can compare.
+QUOTE_MAX_SELECTIONS = env.int("QUOTE_MAX_SELECTIONS", default=50)